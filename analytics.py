@@ -0,0 +1,188 @@
+import threading
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from flowers import normalize as normalize_flower
+from store import Store
+
+# Окна сумм потерь (дней) и период, по которому считается обычная неделя
+SHORT_WINDOW = 7
+LONG_WINDOW = 30
+BASELINE_DAYS = 182
+# Неделя выделяется, если потери не меньше MIN_FLAGGED штук, в RATIO_THRESHOLD
+# раз выше средней недели и выше среднего на Z_THRESHOLD стандартных отклонений
+MIN_FLAGGED = 5
+RATIO_THRESHOLD = 2.0
+Z_THRESHOLD = 2.0
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _day_number(iso: str) -> int:
+    return (date.fromisoformat(iso[:10]) - _EPOCH).days
+
+
+class LossSeries:
+    """
+    Потери цветов магазина как столбцовый временной ряд: по событию на
+    (день, цветок, продавец) с количеством, в массивах numpy.
+
+    Источники - пропавшие цветы (/add_lost_flowers) и пропавшие букеты
+    (/lost_bouquet, лежат в архиве). Ряд строится один раз, дальше
+    дополняется по журналу событий, поэтому работает и когда данные пишет
+    другой процесс.
+    """
+
+    def __init__(self, store: Store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._restore_epoch = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._flower_ids: Dict[str, int] = {}
+        self._seller_ids: Dict[str, int] = {}
+        self.flowers, self.sellers = [], []
+        self._columns = {name: np.empty(0, dtype=np.int32) for name in ('day', 'flower', 'seller', 'quantity')}
+        self._pending: List[Tuple[int, int, int, int]] = []
+        self._seen = set()
+        self._journal_ts = ''
+
+    def _add(self, source: str, chat_id_key: str, key: str, day_iso: str, composition: Dict[str, int]) -> None:
+        if (source, chat_id_key, key) in self._seen or not day_iso:
+            return
+        self._seen.add((source, chat_id_key, key))
+        day = _day_number(day_iso)
+        seller = self._seller_ids.setdefault(chat_id_key, len(self._seller_ids))
+        if seller == len(self.sellers):
+            self.sellers.append(chat_id_key)
+        for flower, quantity in composition.items():
+            name = normalize_flower(flower)
+            flower_id = self._flower_ids.setdefault(name, len(self._flower_ids))
+            if flower_id == len(self.flowers):
+                self.flowers.append(name)
+            self._pending.append((day, flower_id, seller, quantity))
+
+    def _build(self) -> None:
+        self._reset()
+        # События с этого момента догоняются по журналу; повторы отсекает _seen
+        self._journal_ts = datetime.now().isoformat()
+        for chat_id_key, timestamps_info in self.store.lost_flowers_copy().items():
+            for timestamp, flowers_info in timestamps_info.items():
+                self._add('flowers', chat_id_key, timestamp, timestamp, flowers_info)
+        for month, archived in self.store.archive.load_months():
+            for chat_id_key, bouquets_info in archived.items():
+                for bouquet_key, bouquet_data in bouquets_info.items():
+                    if bouquet_data.get('is_lost'):
+                        self._add('bouquet', chat_id_key, bouquet_key,
+                                  bouquet_data.get('sold_lost_date', ''), bouquet_data['composition'])
+
+    def _catch_up(self) -> None:
+        events = list(self.store.journal.since(self._journal_ts))
+        if not events:
+            return
+        self._journal_ts = events[-1]['ts']
+        lost_flowers = self.store.lost_flowers_copy()
+        months = {}
+        for event in events:
+            if event['kind'] == 'lost_flowers':
+                flowers_info = lost_flowers.get(event['chat_id'], {}).get(event['key'])
+                if flowers_info:
+                    self._add('flowers', event['chat_id'], event['key'], event['key'], flowers_info)
+            elif event['kind'] == 'bouquet_closed' and event.get('is_lost', 1):
+                month = event['month']
+                if month not in months:
+                    months[month] = dict(self.store.archive.load_months([month])).get(month, {})
+                bouquet_data = months[month].get(event['chat_id'], {}).get(event['key'])
+                if bouquet_data and bouquet_data.get('is_lost'):
+                    self._add('bouquet', event['chat_id'], event['key'],
+                              bouquet_data.get('sold_lost_date', ''), bouquet_data['composition'])
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Актуальные столбцы ряда: day (дни от 1970-01-01), flower, seller, quantity."""
+        with self._lock:
+            self.store.refresh()
+            if self._restore_epoch != self.store.restore_epoch:
+                self._restore_epoch = self.store.restore_epoch
+                self._build()
+            else:
+                self._catch_up()
+            if self._pending:
+                pending = np.array(self._pending, dtype=np.int32)
+                for i, name in enumerate(('day', 'flower', 'seller', 'quantity')):
+                    self._columns[name] = np.concatenate([self._columns[name], pending[:, i]])
+                self._pending = []
+            return dict(self._columns)
+
+    def summary(self, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Потери по цветам за последние SHORT_WINDOW и LONG_WINDOW дней и
+        отметка необычного роста за неделю.
+
+        Returns:
+            list: Словари flower, week, month, baseline, ratio, flagged,
+            top_sellers; по убыванию потерь за LONG_WINDOW дней.
+        """
+        columns = self.columns()
+        today_number = ((today or date.today()) - _EPOCH).days
+        days = BASELINE_DAYS + SHORT_WINDOW
+        first_day = today_number - days + 1
+        mask = (columns['day'] >= first_day) & (columns['day'] <= today_number)
+        if not mask.any():
+            return []
+
+        n_flowers = len(self.flowers)
+        day_offsets = columns['day'][mask] - first_day
+        flower_ids = columns['flower'][mask]
+        quantities = columns['quantity'][mask]
+        # Матрица день x цветок и скользящие суммы через накопленную сумму
+        daily = np.bincount(day_offsets * n_flowers + flower_ids, weights=quantities,
+                            minlength=days * n_flowers).reshape(days, n_flowers)
+        cumulative = np.vstack([np.zeros((1, n_flowers)), np.cumsum(daily, axis=0)])
+        rolling_week = cumulative[SHORT_WINDOW:] - cumulative[:-SHORT_WINDOW]
+        week = rolling_week[-1]
+        month = cumulative[-1] - cumulative[-1 - LONG_WINDOW]
+        # Обычная неделя: недельные суммы до текущей недели
+        history = rolling_week[:-SHORT_WINDOW]
+        baseline = history.mean(axis=0)
+        spread = history.std(axis=0)
+        flagged = (week >= MIN_FLAGGED) & (week >= RATIO_THRESHOLD * baseline) \
+            & (week > baseline + Z_THRESHOLD * spread)
+
+        # Продавцы с наибольшими потерями за неделю по каждому цветку
+        week_mask = day_offsets >= days - SHORT_WINDOW
+        n_sellers = len(self.sellers)
+        by_seller = np.bincount(flower_ids[week_mask] * n_sellers + columns['seller'][mask][week_mask],
+                                weights=quantities[week_mask],
+                                minlength=n_flowers * n_sellers).reshape(n_flowers, n_sellers)
+
+        result = []
+        for flower_id in np.argsort(-month, kind='stable'):
+            if month[flower_id] == 0 and week[flower_id] == 0:
+                continue
+            top = [(self.sellers[seller], int(by_seller[flower_id, seller]))
+                   for seller in np.argsort(-by_seller[flower_id], kind='stable')[:3] if by_seller[flower_id, seller]]
+            result.append({
+                'flower': self.flowers[flower_id],
+                'week': int(week[flower_id]),
+                'month': int(month[flower_id]),
+                'baseline': float(baseline[flower_id]),
+                'ratio': float(week[flower_id] / baseline[flower_id]) if baseline[flower_id] else None,
+                'flagged': bool(flagged[flower_id]),
+                'top_sellers': top,
+            })
+        return result
+
+
+_series: Dict[str, LossSeries] = {}
+_series_lock = threading.Lock()
+
+
+def get_loss_series(store: Store) -> LossSeries:
+    """Ряд потерь магазина (строится при первом запросе и дальше дополняется)."""
+    with _series_lock:
+        if store.data_dir not in _series:
+            _series[store.data_dir] = LossSeries(store)
+        return _series[store.data_dir]
@@ -0,0 +1,219 @@
+import io
+import os
+import time
+import gzip
+import logging
+import tarfile
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import schema
+from metrics import REGISTRY
+from store import Store
+
+# Резервные копии папки данных магазина: tar с JSON хранилищ, архивом и журналом,
+# сжатый zstd (если установлен zstandard) или gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BACKUPS_DIR = 'backups'
+# Файлы верхнего уровня, которые попадают в копию (кроме склада и пропаж из памяти).
+# Каталог цветов общий для всех магазинов (data/flower_catalog.json) и в копию не входит.
+BACKUP_FILES = ('admin_users.json', 'report_watermarks.json')
+# Папки, которые копируются целиком, и расширения их файлов
+BACKUP_DIRS = (('archive', '.json'), ('journal', '.jsonl'))
+_NAME_PREFIX = 'snapshot_'
+_TS_FORMAT = '%Y-%m-%dT%H%M%S'
+
+
+def backups_dir(store: Store) -> str:
+    return os.path.join(store.data_dir, BACKUPS_DIR)
+
+
+def _collect(store: Store) -> Dict[str, bytes]:
+    """Содержимое копии: относительный путь -> байты, снятые под блокировкой магазина."""
+    files = {}
+    with store.lock:
+        # Склад и пропажи берутся из памяти: это последнее согласованное состояние
+        files['bouquets.json'] = schema.dumps(store.bouquets_handler.schema.encode(store.bouquets))
+        files['lost_flowers.json'] = schema.dumps(store.lost_flowers_handler.schema.encode(store.lost_flowers))
+        paths = list(BACKUP_FILES)
+        for dir_name, extension in BACKUP_DIRS:
+            try:
+                names = os.listdir(os.path.join(store.data_dir, dir_name))
+            except FileNotFoundError:
+                continue
+            paths.extend(f'{dir_name}/{name}' for name in sorted(names) if name.endswith(extension))
+        for rel_path in paths:
+            try:
+                with open(os.path.join(store.data_dir, rel_path), 'rb') as file:
+                    files[rel_path] = file.read()
+            except FileNotFoundError:
+                continue
+    return files
+
+
+def take_snapshot(store: Store) -> str:
+    """
+    Сохраняет сжатую копию данных магазина в папку backups.
+
+    Под блокировкой магазина данные только копируются в память; сжатие и
+    запись идут после нее, поэтому обработчики почти не ждут.
+
+    Returns:
+        str: Путь к файлу копии.
+    """
+    start = time.perf_counter()
+    store.refresh()
+    files = _collect(store)
+    taken_at = datetime.now()
+
+    target_dir = backups_dir(store)
+    os.makedirs(target_dir, exist_ok=True)
+    extension = '.tar.zst' if zstandard is not None else '.tar.gz'
+    path = os.path.join(target_dir, _NAME_PREFIX + taken_at.strftime(_TS_FORMAT) + extension)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as raw:
+        if zstandard is not None:
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+        else:
+            stream = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+        with stream, tarfile.open(fileobj=stream, mode='w|') as tar:
+            for rel_path, payload in files.items():
+                info = tarfile.TarInfo(rel_path)
+                info.size = len(payload)
+                info.mtime = int(taken_at.timestamp())
+                tar.addfile(info, io.BytesIO(payload))
+    os.replace(tmp_path, path)
+
+    REGISTRY.observe('backup_seconds', time.perf_counter() - start, shop=os.path.basename(store.data_dir))
+    REGISTRY.inc('backup_bytes_total', os.path.getsize(path), shop=os.path.basename(store.data_dir))
+    return path
+
+
+def list_snapshots(store: Store) -> List[Tuple[datetime, str]]:
+    """Копии магазина (момент, путь) от старых к новым."""
+    target_dir = backups_dir(store)
+    try:
+        names = os.listdir(target_dir)
+    except FileNotFoundError:
+        return []
+    snapshots = []
+    for name in names:
+        if not name.startswith(_NAME_PREFIX) or not name.endswith(('.tar.zst', '.tar.gz')):
+            continue
+        try:
+            taken_at = datetime.strptime(name[len(_NAME_PREFIX):].split('.')[0], _TS_FORMAT)
+        except ValueError:
+            continue
+        snapshots.append((taken_at, os.path.join(target_dir, name)))
+    return sorted(snapshots)
+
+
+def prune_snapshots(store: Store, keep_last: int, keep_days: int) -> int:
+    """
+    Удаляет старые копии: остаются keep_last последних и последняя копия
+    каждого из keep_days последних дней.
+
+    Returns:
+        int: Сколько копий удалено.
+    """
+    snapshots = list_snapshots(store)
+    keep = {path for _, path in snapshots[-keep_last:]} if keep_last > 0 else set()
+    oldest_day = (datetime.now() - timedelta(days=keep_days)).date()
+    last_of_day = {}
+    for taken_at, path in snapshots:
+        if taken_at.date() > oldest_day:
+            last_of_day[taken_at.date()] = path
+    keep.update(last_of_day.values())
+
+    removed = 0
+    for _, path in snapshots:
+        if path not in keep:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def _restorable(rel_path: str) -> bool:
+    if rel_path in ('bouquets.json', 'lost_flowers.json') or rel_path in BACKUP_FILES:
+        return True
+    return any(rel_path.startswith(dir_name + '/') and rel_path.endswith(extension)
+               for dir_name, extension in BACKUP_DIRS)
+
+
+def _open_snapshot(path: str) -> tarfile.TarFile:
+    if path.endswith('.tar.zst'):
+        if zstandard is None:
+            raise RuntimeError('Для чтения копии .tar.zst нужен пакет zstandard')
+        return tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True), mode='r|')
+    return tarfile.open(path, mode='r:gz')
+
+
+def restore_snapshot(store: Store, at: datetime) -> str:
+    """
+    Возвращает данные магазина к последней копии, снятой не позже момента at.
+
+    Перед восстановлением снимается копия текущего состояния. Файлы архива
+    и журнала, которых нет в копии, удаляются, чтобы букеты не оказались
+    одновременно на складе и в архиве.
+
+    Returns:
+        str: Путь к копии, из которой восстановлены данные.
+
+    Raises:
+        ValueError: Нет копии не позже at.
+    """
+    candidates = [path for taken_at, path in list_snapshots(store) if taken_at <= at]
+    if not candidates:
+        raise ValueError(f"Нет резервной копии раньше {at.strftime('%Y-%m-%d %H:%M')}")
+    source = candidates[-1]
+
+    with _open_snapshot(source) as tar:
+        # Старые копии могли содержать файлы, которые больше не восстанавливаются
+        files = {member.name: tar.extractfile(member).read() for member in tar
+                 if member.isfile() and _restorable(member.name)}
+
+    take_snapshot(store)
+    with store.lock:
+        for dir_name, extension in BACKUP_DIRS:
+            dir_path = os.path.join(store.data_dir, dir_name)
+            try:
+                names = os.listdir(dir_path)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if name.endswith(extension) and f'{dir_name}/{name}' not in files:
+                    os.remove(os.path.join(dir_path, name))
+        for rel_path, payload in files.items():
+            path = os.path.join(store.data_dir, *rel_path.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as file:
+                file.write(payload)
+            os.replace(path + '.tmp', path)
+        store.mark_restored(source)
+    return source
+
+
+def start_snapshot_thread(get_stores: Callable[[], Dict[str, Store]], interval: float,
+                          keep_last: int, keep_days: int) -> threading.Thread:
+    """Фоновый поток: раз в interval секунд снимает копии всех магазинов и чистит старые."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            for shop, store in get_stores().items():
+                try:
+                    path = take_snapshot(store)
+                    removed = prune_snapshots(store, keep_last, keep_days)
+                    logger.info('Резервная копия магазина %s: %s (удалено старых: %s)', shop, path, removed)
+                except Exception:
+                    logger.exception('Не удалось снять резервную копию магазина %s', shop)
+
+    thread = threading.Thread(target=loop, name='backups', daemon=True)
+    thread.start()
+    return thread
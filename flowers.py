@@ -0,0 +1,118 @@
+import re
+import json
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Строка состава: "название количество", в названии нет цифр
+LINE_RE = re.compile(r'^\s*(?P<flower>[^\d]*?[^\d\s])\s+(?P<quantity>\d+)\s*$')
+
+# Формы названий -> основное название цветка
+DEFAULT_ALIASES = {
+    'розы': 'роза', 'роз': 'роза', 'розочка': 'роза', 'розочки': 'роза',
+    'кустовая роза': 'роза кустовая', 'кустовые розы': 'роза кустовая', 'розы кустовые': 'роза кустовая',
+    'пионы': 'пион', 'пионов': 'пион',
+    'тюльпаны': 'тюльпан', 'тюльпанов': 'тюльпан',
+    'хризантемы': 'хризантема', 'хризантем': 'хризантема',
+    'гвоздики': 'гвоздика', 'гвоздик': 'гвоздика',
+    'лилии': 'лилия', 'лилий': 'лилия',
+    'ромашки': 'ромашка', 'ромашек': 'ромашка',
+    'ирисы': 'ирис', 'ирисов': 'ирис',
+    'гортензии': 'гортензия', 'гортензий': 'гортензия',
+    'альстромерии': 'альстромерия', 'альстромерий': 'альстромерия',
+    'эустомы': 'эустома', 'эустом': 'эустома', 'лизиантус': 'эустома',
+    'герберы': 'гербера', 'гербер': 'гербера',
+    'орхидеи': 'орхидея', 'орхидей': 'орхидея',
+    'ранункулюсы': 'ранункулюс', 'ранункулюсов': 'ранункулюс',
+    'подсолнухи': 'подсолнух', 'подсолнухов': 'подсолнух',
+    'гипсофилы': 'гипсофила', 'гипсофил': 'гипсофила',
+    'эвкалипта': 'эвкалипт', 'эвкалипты': 'эвкалипт', 'эвкалиптов': 'эвкалипт',
+    'фисташки': 'фисташка', 'фисташек': 'фисташка',
+}
+
+# Окончания множественного числа и родительного падежа, которые пробуем отбросить
+_PLURAL_ENDINGS = (('ов', ''), ('ев', ''), ('ей', 'я'), ('ий', 'ия'), ('ы', 'а'), ('ы', ''), ('и', 'а'), ('и', 'я'))
+
+
+class FlowerCatalog:
+    """
+    Справочник названий цветов: основные названия и их формы.
+
+    Нормализация: нижний регистр, 'ё' -> 'е', лишние пробелы, таблица форм,
+    затем отбрасывание окончаний, если получается известное основное название.
+    """
+
+    def __init__(self, aliases: Dict[str, str] = None):
+        self.aliases: Dict[str, str] = {}
+        self.names = set()
+        self.update(DEFAULT_ALIASES if aliases is None else aliases)
+
+    def update(self, aliases: Dict[str, str]) -> None:
+        """Добавляет формы названий (например, из data/flower_catalog.json)."""
+        for alias, name in aliases.items():
+            name = _clean(name)
+            self.aliases[_clean(alias)] = name
+            self.names.add(name)
+        self.normalize.cache_clear()
+
+    def load(self, path: str) -> None:
+        """Подгружает дополнительные формы из JSON-файла {форма: название}, если он есть."""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                self.update(json.load(file))
+        except FileNotFoundError:
+            pass
+
+    @lru_cache(maxsize=4096)
+    def normalize(self, flower: str) -> str:
+        """Возвращает основное название цветка."""
+        name = _clean(flower)
+        if name in self.aliases:
+            return self.aliases[name]
+        if name in self.names:
+            return name
+        for ending, replacement in _PLURAL_ENDINGS:
+            if name.endswith(ending):
+                stem = name[:-len(ending)] + replacement
+                if stem in self.names:
+                    return stem
+        return name
+
+
+def _clean(name: str) -> str:
+    return ' '.join(name.lower().replace('ё', 'е').strip(' .,;:-').split())
+
+
+CATALOG = FlowerCatalog()
+
+
+def normalize(flower: str) -> str:
+    """Основное название цветка по общему справочнику."""
+    return CATALOG.normalize(flower)
+
+
+def parse_composition(text: str) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Разбирает состав в формате 'цветок количество' по строке на цветок.
+
+    Одинаковые цветы (в том числе записанные разными формами) суммируются.
+
+    Args:
+        text (str): Текст сообщения.
+
+    Returns:
+        tuple: (состав {название: количество}, некорректные строки).
+    """
+    composition: Dict[str, int] = {}
+    errors: List[str] = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = LINE_RE.match(line)
+        if match is None:
+            errors.append(line)
+            continue
+        flower = CATALOG.normalize(match.group('flower'))
+        composition[flower] = composition.get(flower, 0) + int(match.group('quantity'))
+    if not composition and not errors:
+        errors.append(text)
+    return composition, errors
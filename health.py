@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import traceback
+from typing import Dict, Any, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Цикл опроса считается зависшим, если getUpdates не возвращался дольше
+# STALL_SECONDS (долгий опрос Telegram - 20 с), а обработчики - если очередь
+# не пуста и ни одна задача не завершилась за это время
+STALL_SECONDS = 90
+CHECK_INTERVAL = 15
+# Как часто спрашивать у Telegram число ожидающих обновлений
+BACKLOG_INTERVAL = 60
+
+
+class BotHealth:
+    """
+    Состояние цикла опроса одного бота: время последнего getUpdates,
+    последнего обработанного обновления, очередь и выполняемые задачи пула.
+
+    Данные собираются обертками над методами экземпляра TeleBot, поэтому
+    обработчики менять не нужно.
+    """
+
+    def __init__(self, bot, name: str, log: logging.Logger = logger, restart_after: float = 0):
+        self.bot = bot
+        self.name = name
+        self.log = log
+        self.restart_after = restart_after
+        self.started_at = time.time()
+        self.last_poll_at: Optional[float] = None
+        self.last_update_at: Optional[float] = None
+        self.last_task_at: Optional[float] = None
+        self.updates_total = 0
+        self.pending_updates: Optional[int] = None
+        self.backlog_checked_at = 0.0
+        self.stalled_since: Optional[float] = None
+        self._running: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._wrap()
+
+    def _wrap(self) -> None:
+        bot = self.bot
+        get_updates = bot.get_updates
+        process_new_updates = bot.process_new_updates
+
+        def tracked_get_updates(*args, **kwargs):
+            updates = get_updates(*args, **kwargs)
+            self.last_poll_at = time.time()
+            return updates
+
+        def tracked_process_new_updates(updates):
+            if updates:
+                self.last_update_at = time.time()
+                self.updates_total += len(updates)
+            return process_new_updates(updates)
+
+        bot.get_updates = tracked_get_updates
+        bot.process_new_updates = tracked_process_new_updates
+
+        pool = getattr(bot, 'worker_pool', None)
+        if pool is not None:
+            put = pool.put
+
+            def tracked_put(func, *args, **kwargs):
+                put(self._track(func), *args, **kwargs)
+
+            pool.put = tracked_put
+
+    def _track(self, func):
+        def task(*args, **kwargs):
+            thread_id = threading.get_ident()
+            with self._lock:
+                self._running[thread_id] = (getattr(func, '__name__', repr(func)), time.time())
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running.pop(thread_id, None)
+                self.last_task_at = time.time()
+        return task
+
+    def queue_depth(self) -> int:
+        pool = getattr(self.bot, 'worker_pool', None)
+        return pool.tasks.qsize() if pool is not None else 0
+
+    def refresh_backlog(self) -> None:
+        """Спрашивает у Telegram число ожидающих обновлений (не чаще BACKLOG_INTERVAL)."""
+        if time.time() - self.backlog_checked_at < BACKLOG_INTERVAL:
+            return
+        self.backlog_checked_at = time.time()
+        try:
+            self.pending_updates = self.bot.get_webhook_info(timeout=5).pending_update_count
+        except Exception as e:
+            self.log.warning('Бот %s: не удалось получить число ожидающих обновлений: %s', self.name, e)
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            running = [{'task': name, 'seconds': round(now - started, 1)} for name, started in self._running.values()]
+        poll_age = now - (self.last_poll_at or self.started_at)
+        task_age = now - (self.last_task_at or self.started_at)
+        queue_depth = self.queue_depth()
+        polling_stalled = poll_age > STALL_SECONDS
+        workers_stalled = queue_depth > 0 and task_age > STALL_SECONDS
+        return {
+            'healthy': not (polling_stalled or workers_stalled),
+            'polling_stalled': polling_stalled,
+            'workers_stalled': workers_stalled,
+            'seconds_since_poll': round(poll_age, 1),
+            'seconds_since_update': round(now - self.last_update_at, 1) if self.last_update_at else None,
+            'updates_total': self.updates_total,
+            'pending_updates': self.pending_updates,
+            'queue_depth': queue_depth,
+            'running_tasks': running,
+        }
+
+
+_bots: Dict[str, BotHealth] = {}
+_watchdog: Optional[threading.Thread] = None
+_watchdog_lock = threading.Lock()
+
+
+def watch(bot, name: str, log: logging.Logger = logger, restart_after: float = 0) -> BotHealth:
+    """
+    Начинает следить за ботом и при первом вызове запускает сторожевой поток.
+
+    Args:
+        bot (telebot.TeleBot): Бот до запуска polling.
+        name (str): Имя бота в /healthz и логе.
+        log (logging.Logger): Куда писать о зависаниях и стеки потоков.
+        restart_after (float): Через сколько секунд зависания завершить
+            процесс, чтобы его перезапустил супервизор (0 - не завершать).
+    """
+    global _watchdog
+    bot_health = BotHealth(bot, name, log, restart_after)
+    with _watchdog_lock:
+        _bots[name] = bot_health
+        if _watchdog is None:
+            _watchdog = threading.Thread(target=_watchdog_loop, name='watchdog', daemon=True)
+            _watchdog.start()
+    return bot_health
+
+
+def status() -> Dict[str, Any]:
+    """Состояние всех ботов процесса."""
+    bots = {name: bot_health.status() for name, bot_health in list(_bots.items())}
+    return {'healthy': all(bot['healthy'] for bot in bots.values()), 'bots': bots}
+
+
+def render_healthz():
+    current = status()
+    return 'application/json', json.dumps(current, ensure_ascii=False), 200 if current['healthy'] else 503
+
+
+def dump_stacks() -> str:
+    """Стеки всех потоков процесса (для поиска места зависания)."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    parts = []
+    for thread_id, frame in sys._current_frames().items():
+        parts.append(f'--- {names.get(thread_id, thread_id)} ---\n' + ''.join(traceback.format_stack(frame)))
+    return '\n'.join(parts)
+
+
+def _watchdog_loop() -> None:
+    while True:
+        time.sleep(CHECK_INTERVAL)
+        for name, bot_health in list(_bots.items()):
+            bot_health.refresh_backlog()
+            current = bot_health.status()
+            if current['healthy']:
+                if bot_health.stalled_since is not None:
+                    bot_health.log.info('Бот %s снова обрабатывает обновления', name)
+                bot_health.stalled_since = None
+                continue
+
+            now = time.time()
+            if bot_health.stalled_since is None:
+                bot_health.stalled_since = now
+                bot_health.log.error('Бот %s завис: %s\n%s', name, json.dumps(current, ensure_ascii=False), dump_stacks())
+            elif bot_health.restart_after and now - bot_health.stalled_since > bot_health.restart_after:
+                bot_health.log.critical('Бот %s завис дольше %s с, процесс завершается для перезапуска',
+                                        name, bot_health.restart_after)
+                logging.shutdown()
+                os._exit(3)
+
+
+metrics.HTTP_ROUTES['/healthz'] = render_healthz
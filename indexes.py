@@ -0,0 +1,132 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, List, Optional, Set, Tuple
+
+from flowers import normalize as normalize_flower
+
+
+class StockIndex:
+    """
+    Индексы по непроданным и непропавшим букетам.
+
+    by_flower - инвертированный индекс: цветок -> {bouquet_key: количество}.
+    owners - chat_id, под которым букет лежит в bouquets.
+    by_owner - букеты каждого продавца: chat_id -> {bouquet_key}.
+    """
+
+    def __init__(self):
+        self.owners: Dict[str, Hashable] = {}
+        self.by_owner: Dict[Hashable, Set[str]] = {}
+        self.by_flower: Dict[str, Dict[str, int]] = {}
+        self._flowers: Dict[str, List[str]] = {}
+
+    @classmethod
+    def build(cls, bouquets: Dict[Hashable, Dict[str, Any]]) -> 'StockIndex':
+        """Строит индекс по всем доступным букетам склада."""
+        index = cls()
+        for chat_id_key, bouquets_info in bouquets.items():
+            for bouquet_key, bouquet_data in bouquets_info.items():
+                index.add(chat_id_key, bouquet_key, bouquet_data)
+        return index
+
+    def clear(self) -> None:
+        self.owners.clear()
+        self.by_owner.clear()
+        self.by_flower.clear()
+        self._flowers.clear()
+
+    def add(self, chat_id_key: Hashable, bouquet_key: str, bouquet_data: Dict[str, Any]) -> None:
+        """Добавляет букет в индекс, если он доступен для продажи."""
+        if bouquet_data.get('sold_flag') or bouquet_data.get('is_lost') or not bouquet_data.get('composition'):
+            return
+        self.remove(bouquet_key)
+        flowers = []
+        for flower, quantity in bouquet_data['composition'].items():
+            key = normalize_flower(flower)
+            postings = self.by_flower.setdefault(key, {})
+            postings[bouquet_key] = postings.get(bouquet_key, 0) + quantity
+            flowers.append(key)
+        self.owners[bouquet_key] = chat_id_key
+        self.by_owner.setdefault(chat_id_key, set()).add(bouquet_key)
+        self._flowers[bouquet_key] = flowers
+
+    def remove(self, bouquet_key: str) -> None:
+        """Удаляет букет из индекса (продан или пропал)."""
+        owner = self.owners.pop(bouquet_key, None)
+        owned = self.by_owner.get(owner)
+        if owned is not None:
+            owned.discard(bouquet_key)
+            if not owned:
+                del self.by_owner[owner]
+        for flower in self._flowers.pop(bouquet_key, ()):
+            postings = self.by_flower.get(flower)
+            if postings is None:
+                continue
+            postings.pop(bouquet_key, None)
+            if not postings:
+                del self.by_flower[flower]
+
+    def owned_by(self, chat_id_key: Hashable) -> List[str]:
+        """Ключи доступных букетов продавца, от старых к новым."""
+        return sorted(self.by_owner.get(chat_id_key, ()))
+
+    def find(self, terms: List[Tuple[str, Optional[int]]]) -> List[str]:
+        """
+        Ищет букеты, в составе которых есть все указанные цветы.
+
+        Args:
+            terms (list): Пары (цветок, количество); количество None - любое.
+
+        Returns:
+            list: Ключи подходящих букетов, от старых к новым.
+        """
+        postings = []
+        for flower, quantity in terms:
+            flower_postings = self.by_flower.get(normalize_flower(flower), {})
+            if quantity is not None:
+                flower_postings = {key: qty for key, qty in flower_postings.items() if qty == quantity}
+            if not flower_postings:
+                return []
+            postings.append(flower_postings)
+
+        # Пересекаем, начиная с самого короткого списка
+        postings.sort(key=len)
+        result = set(postings[0])
+        for flower_postings in postings[1:]:
+            result.intersection_update(flower_postings)
+            if not result:
+                break
+        return sorted(result)
+
+
+class BoundedLRU:
+    """Множество последних ключей ограниченного размера (старые вытесняются)."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._keys: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Запоминает ключ.
+
+        Returns:
+            bool: True, если ключа еще не было (первое появление).
+        """
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return False
+            self._keys[key] = None
+            if len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+            return True
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._keys
@@ -1,67 +1,84 @@
 import os
+import re
 import json
-import pandas as pd
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 import telebot
 from telebot import types
 from decouple import config
-from openpyxl import Workbook
 from functools import partial
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from telebot.types import Message, CallbackQuery, Update
 from functools import wraps
 import logging
+import time
+
+import metrics
+import health
+import backups
+import profiling
+import reports
+import flowers
+from storage import DataHandler
+from shops import ShardMap
+from store import Store
 
 # Константы
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
-BOUQUETS_FILE = os.path.join(DATA_DIR, 'bouquets.json')
-LOST_FLOWERS_FILE = os.path.join(DATA_DIR, 'lost_flowers.json')
-REPORT_FILE = os.path.join(DATA_DIR, 'report.xlsx')
-ADMIN_USERS_FILE = os.path.join(DATA_DIR, 'admin_users.json')
+SHOPS_FILE = os.path.join(DATA_DIR, 'shops.json')
+# Файлы отчетов лежат в папке данных магазина
+REPORT_FILE = 'report.xlsx'
+WATERMARKS_FILE = 'report_watermarks.json'
+DELTA_REPORT_FILE = 'report_new.xlsx'
+REPORTS_DIR = 'reports'
+METRICS_FILE = os.path.join(DATA_DIR, 'metrics_admin.json')
+SELLER_METRICS_FILE = os.path.join(DATA_DIR, 'metrics_seller.json')
+PROFILES_DIR = os.path.join(DATA_DIR, 'profiles')
+FLOWER_CATALOG_FILE = os.path.join(DATA_DIR, 'flower_catalog.json')
+REPORT_FORMATS = ('xlsx', 'csv', 'parquet')
 TOKEN = config('ADMIN_BOT_TOKEN')
+METRICS_PORT = config('ADMIN_METRICS_PORT', default=0, cast=int)
+SHOP_WORKER = config('SHOP_WORKER', default=0, cast=int)
+# Через сколько секунд зависания цикла опроса завершать процесс для перезапуска (0 - не завершать)
+HEALTH_RESTART_SECONDS = config('HEALTH_RESTART_SECONDS', default=0, cast=int)
+# Расписание готовых отчетов: время сборки, день недельного отчета (0 - понедельник),
+# рассылка админам и сколько часов ежедневный отчет считается свежим
+REPORT_SCHEDULE_TIME = config('REPORT_SCHEDULE_TIME', default='03:00')
+REPORT_WEEKLY_DAY = config('REPORT_WEEKLY_DAY', default=0, cast=int)
+REPORT_PUSH = config('REPORT_PUSH', default=False, cast=bool)
+REPORT_MAX_AGE_HOURS = config('REPORT_MAX_AGE_HOURS', default=24, cast=int)
+REPORT_KEEP = config('REPORT_KEEP', default=14, cast=int)
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler = logging.FileHandler(os.path.join(BASE_DIR, 'bot.log'), encoding='utf-8', mode='w')
+file_handler = logging.FileHandler(os.path.join(BASE_DIR, 'admin_bot.log'), encoding='utf-8', mode='a')
 file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
 # Инициализация бота
 bot = telebot.TeleBot(TOKEN)
+instrument = metrics.instrument('admin')
 
-class DataHandler:
-    def __init__(self, file_path: str):
-        self.file_path = file_path
+# Магазины этого процесса; данные каждого - в его Store (см. shops.py, store.py)
+shards = ShardMap.load(SHOPS_FILE, DATA_DIR, SHOP_WORKER)
+flowers.CATALOG.load(FLOWER_CATALOG_FILE)
+
+
+def shop_path(store: Store, name: str) -> str:
+    """Путь к файлу в папке данных магазина."""
+    return os.path.join(store.data_dir, name)
 
-    def load(self) -> Dict[str, Any]:
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return {}
-
-    def save(self, data: Dict[str, Any]) -> None:
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
-
-# Инициализация обработчиков данных
-bouquets_handler = DataHandler(BOUQUETS_FILE)
-lost_flowers_handler = DataHandler(LOST_FLOWERS_FILE)
-admin_users_handler = DataHandler(ADMIN_USERS_FILE)
-
-# Загрузка данных
-# bouquets = bouquets_handler.load()
-# lost_flowers = lost_flowers_handler.load()
-admin_users = admin_users_handler.load()
-ADMIN_CHAT_ID = [int(admin['chat_id']) for admin in admin_users['admins']]
 
 def require_admin(func):
     """Декоратор для ограничения доступа к команде неадминистраторам."""
+    @wraps(func)
     def wrapper(message, *args, **kwargs):
-        if message.chat.id not in ADMIN_CHAT_ID:
+        store = shards.store_for(message.chat.id)
+        user = store.users.get(message.chat.id) if store is not None else None
+        if user is None or user['role'] != 'admins':
             bot.reply_to(message, 'У вас нет прав доступа к этой команде.')
             return
         return func(message, *args, **kwargs)
@@ -69,6 +86,7 @@ def require_admin(func):
 
 
 @bot.callback_query_handler(func=lambda call: call.data == 'cancel')
+@instrument
 def cancel_callback(call):
     """Обрабатывает нажатие кнопки "Отменить"."""
     chat_id = call.message.chat.id
@@ -78,12 +96,14 @@ def cancel_callback(call):
     
     
 @bot.message_handler(commands=['start'])
+@instrument
 @require_admin
 def start_command(message):
     bot.reply_to(message, 'Привет! Этот бот для админов цветочного магазина. Используйте /help для справки.')
     
     
 @bot.message_handler(commands=['help'])
+@instrument
 def help_command(message):
     """Предоставляет информацию о командах бота."""
     # if message.chat.id not in ADMIN_CHAT_ID:
@@ -93,9 +113,18 @@ def help_command(message):
         - /start: Поприветствует вас и расскажет о возможностях бота.
         - /help: Покажет эту справку.
         - /report: Сгенерирует отчет по букетам и пропавшим цветам.
+        - /report 2024-05 2024-06: Отчет с архивом только за указанные месяцы.
+        - /report csv, /report parquet: Выгрузка в CSV (gzip) или Parquet вместо Excel.
+        - /report week: Недельный отчет; /report fresh: собрать отчет заново, а не взять готовый из расписания.
+        - /report new: Только изменения с вашего прошлого /report new.
         - /add_user: Добавить нового пользователя.
         - /del_user: удалить пользователя
         - /users_list: Список всех админов и пользователей
+        - /metrics: Статистика обработчиков и хранилища
+        - /profile N или /profile Ns: Профилировать следующие N вызовов или N секунд
+        - /losses [цветок]: Потери цветов за 7 и 30 дней с отметкой необычного роста
+        - /backup: Снять резервную копию данных сейчас
+        - /restore: Список копий; /restore 2024-05-01 18:00: вернуть данные к этому моменту
 
         Пожалуйста, вводите команды в точности так, как они указаны.
         """
@@ -103,110 +132,406 @@ def help_command(message):
 
 
 @bot.message_handler(commands=['report'])
+@instrument
 @require_admin
 def report_command(message):
     """Генерирует отчет и отправляет его администраторам."""
+    args = message.text.lower().split()[1:]
+    months = [arg for arg in args if re.fullmatch(r'\d{4}-\d{2}', arg)]
+    report_format = next((arg for arg in args if arg in REPORT_FORMATS), 'xlsx')
+    kind = 'weekly' if 'week' in args else 'daily'
+    store = shards.store_for(message.chat.id)
     try:
-        writer = generate_report()
-        writer.save()
-        with open(REPORT_FILE, 'rb') as file:
-            bot.send_document(message.chat.id, file, caption='Отчет по букетам и пропавшим цветам')
+        if 'new' in args:
+            report_delta(message, store, report_format)
+            return
+        caption = 'Отчет по букетам и пропавшим цветам'
+        report_path = None
+        if report_format == 'xlsx' and not months and 'fresh' not in args:
+            # Готовый отчет из расписания, если он достаточно свежий
+            report_path = latest_report_artifact(store, kind)
+        if report_path is not None:
+            fresh_command = '/report week fresh' if kind == 'weekly' else '/report fresh'
+            caption = f'Отчет на {format_built_at(artifact_built_at(report_path))}, {fresh_command} для актуального'
+            report_paths = [report_path]
+        elif kind == 'weekly' and not months:
+            report_paths = generate_report(store, report_format=report_format,
+                                           since=datetime.now() - timedelta(days=7))
+        else:
+            report_paths = generate_report(store, months or None, report_format)
+        for report_path in report_paths:
+            with open(report_path, 'rb') as file:
+                bot.send_document(message.chat.id, file, caption=caption)
     except Exception as e:
         bot.reply_to(message, f'Произошла ошибка при создании отчета: {e}')
 
 
-def generate_report() -> pd.ExcelWriter:
-    """Генерирует отчет в формате Excel."""
-    writer = pd.ExcelWriter(REPORT_FILE, engine='xlsxwriter')
-
-    bouquets = bouquets_handler.load()
-    lost_flowers = lost_flowers_handler.load()
-    # Создадим таблицу с именами и chat_id
-    data = admin_users_handler.load()
-
-    id_names = pd.DataFrame(data['admins'] + data['users'])
-
-    # Добавляем данные о букетах в отчет
-    if bouquets:    
-        df = pd.DataFrame(columns=['chat_id', 'date', 'price', 'Название цветка', 'Количество', 'sold_flag', 'is_lost', 'seller_id', 'sold\lost_date'])
-        
-        # Проходим по данным и добавляем строки в DataFrame
-        for chat_id_key, bouquets_info in bouquets.items():
-            for bouquet_key, bouquet_data in bouquets_info.items():
-                    price = bouquet_data['price']
-                    composition = bouquet_data['composition']
-                    sold_flag = bouquet_data['sold_flag']
-                    is_lost = bouquet_data['is_lost']
-                    seller_id = bouquet_data['seller_id']
-                    sold_lost_date = bouquet_data['sold_lost_date']
-                    # Создаем временный DataFrame для composition
-                    temp_df = pd.DataFrame.from_dict(composition, orient='index', columns=['Количество'])
-                    
-                    # Добавляем колонку "Название цветка"
-                    temp_df['Название цветка'] = temp_df.index
-                    
-                    # Добавляем остальные колонки
-                    temp_df['chat_id'] = chat_id_key
-                    temp_df['date'] = bouquet_key
-                    temp_df['price'] = price
-                    temp_df['sold_flag'] = sold_flag
-                    temp_df['is_lost'] = is_lost
-                    temp_df['seller_id'] = seller_id
-                    temp_df['sold\lost_date'] = sold_lost_date
-                    # Объединяем временный DataFrame с основным
-                    df = pd.concat([df, temp_df])
-
-        # Сбрасываем мультииндекс для корректного отображения
-        # df.reset_index(drop=True, inplace=True)
-        timestamp_shortened = bouquet_key[:10]
-        
-        df = df.merge(id_names, on='chat_id', how='left') # Добавим имена в отчет
-        
-        id_names_ = id_names.rename({'name': 'seller_name'}, axis=1)
-        
-        df = df.merge(id_names_, left_on='seller_id',
-                    right_on='chat_id', how='left', suffixes=('', '_')).drop(['chat_id_'], axis=1)
-
-        df = df[['chat_id', 'name', 'date', 'price', 'Название цветка', 
-                'Количество', 'sold_flag', 'is_lost', 'seller_id', 'seller_name', 'sold\lost_date']]
-        df.to_excel(writer, sheet_name=f'Bouquets_{timestamp_shortened}', index=False)
-    else:
-        pass
-
-    # Добавляем данные о пропавших цветах в отчет
-    if lost_flowers:
-        df_lost = pd.DataFrame(columns=['chat_id', 'timestamp', 'Название цветка', 'Количество'])
-
-        # Проходим по данным и добавляем строки в DataFrame
-        for chat_id_key, timestamps_info in lost_flowers.items():
-            for timestamp, flowers_info in timestamps_info.items():
-                # Создаем временный DataFrame для цветов
-                temp_df = pd.DataFrame.from_dict(flowers_info, orient='index', columns=['Количество'])
-                
-                # Добавляем колонку "Название цветка"
-                temp_df['Название цветка'] = temp_df.index
-                
-                # Добавляем остальные колонки
-                temp_df['chat_id'] = chat_id_key
-                temp_df['timestamp'] = timestamp
-                
-                # Объединяем временный DataFrame с основным
-                df_lost = pd.concat([df_lost, temp_df])
-
-        # Сбрасываем индекс для корректного отображения
-        df_lost.reset_index(drop=True, inplace=True)
-        timestamp_shortened = timestamp[:10]
-
-        df_lost = df_lost.merge(id_names, on='chat_id', how='left') # Добавим имена в отчет
-        df_lost = df_lost[['chat_id', 'name', 'timestamp', 'Название цветка', 'Количество']]
-        df_lost.to_excel(writer, sheet_name=f'Lost_flowers_{timestamp_shortened}', index=False, index_label=['chat_id', 'timestamp'])
+def load_bouquets_with_archive(store: Store, months=None) -> Dict[str, Any]:
+    """
+    Загружает текущий склад и архив проданных/пропавших букетов магазина.
+
+    Args:
+        store (Store): Данные магазина.
+        months (list): Месяцы архива (YYYY-MM). None - весь архив.
+
+    Returns:
+        dict: Букеты в формате bouquets.json.
+    """
+    store.refresh()
+    bouquets = store.bouquets_copy()
+    for month, archived in store.archive.load_months(months):
+        for chat_id_key, bouquets_info in archived.items():
+            bouquets.setdefault(chat_id_key, {}).update(bouquets_info)
+    return bouquets
+
+
+def generate_report(store: Store, months=None, report_format='xlsx', path=None, since=None) -> List[str]:
+    """
+    Генерирует отчет в формате Excel, CSV (gzip) или Parquet.
+
+    Excel-книга собирается в процессе из пула, см. reports.write_xlsx.
+    CSV и Parquet пишутся потоком из хранилища.
+
+    Args:
+        store (Store): Данные магазина.
+        months (list): Месяцы архива (YYYY-MM). None - весь архив.
+        report_format (str): 'xlsx', 'csv' или 'parquet'.
+        path (str): Куда сохранить Excel-отчет (по умолчанию report.xlsx магазина).
+        since (datetime): Только события начиная с этого момента.
+
+    Returns:
+        list: Пути к файлам отчета.
+    """
+    if since is not None and months is None:
+        # Архив нужен только за месяцы периода
+        months = reports.months_between(since, datetime.now())
+    bouquets = load_bouquets_with_archive(store, months)
+    lost_flowers = store.lost_flowers_copy()
+    if since is not None:
+        bouquets, lost_flowers = reports.filter_since(bouquets, lost_flowers, since.isoformat())
+    return write_report(store, bouquets, lost_flowers, report_format, path)
+
+
+def write_report(store: Store, bouquets, lost_flowers, report_format='xlsx', path=None) -> List[str]:
+    """Записывает отчет магазина в нужном формате и возвращает пути к файлам."""
+    # Имена пользователей по chat_id
+    names = store.users.names()
+
+    if report_format == 'csv':
+        return reports.write_csv(store.data_dir, bouquets, lost_flowers, names)
+    if report_format == 'parquet':
+        return reports.write_parquet(store.data_dir, bouquets, lost_flowers, names)
+    return [reports.write_xlsx(path or shop_path(store, REPORT_FILE), bouquets, lost_flowers, names)]
+
+
+def report_delta(message, store: Store, report_format='xlsx') -> None:
+    """
+    Отправляет только букеты и пропавшие цветы, появившиеся или изменившиеся
+    после прошлого /report new этого админа (его водяной знак).
+
+    События берутся из журнала по дням, поэтому стоимость зависит только
+    от объема новой активности.
+    """
+    chat_id = message.chat.id
+    watermarks_handler = DataHandler(shop_path(store, WATERMARKS_FILE))
+    watermarks = watermarks_handler.load()
+    watermark = watermarks.get(str(chat_id))
+
+    if watermark is None:
+        # Первый запрос: полный отчет, дальше - только изменения
+        new_watermark = datetime.now().isoformat()
+        report_paths = generate_report(store, report_format=report_format, path=shop_path(store, DELTA_REPORT_FILE))
     else:
-        pass
-        
-    return writer
+        events = list(store.journal.since(watermark))
+        if not events:
+            bot.reply_to(message, 'С прошлого отчета изменений нет.')
+            return
+        new_watermark = events[-1]['ts']
+        bouquets, lost_flowers = collect_delta(store, events)
+        report_paths = write_report(store, bouquets, lost_flowers, report_format, shop_path(store, DELTA_REPORT_FILE))
+
+    caption = f"Изменения с {watermark[:16].replace('T', ' ')}" if watermark else 'Полный отчет'
+    for report_path in report_paths:
+        with open(report_path, 'rb') as file:
+            bot.send_document(chat_id, file, caption=caption)
+
+    # Водяной знак сдвигается только после успешной отправки
+    watermarks = watermarks_handler.load()
+    watermarks[str(chat_id)] = new_watermark
+    watermarks_handler.save(watermarks)
+
+
+def collect_delta(store: Store, events):
+    """
+    Собирает записи, затронутые событиями журнала.
+
+    Закрытые букеты читаются только из архивов их месяцев.
+
+    Returns:
+        tuple: (букеты, пропавшие цветы) в формате bouquets.json и lost_flowers.json.
+    """
+    bouquet_keys = {(event['chat_id'], event['key']) for event in events if event['kind'] != 'lost_flowers'}
+    lost_keys = {(event['chat_id'], event['key']) for event in events if event['kind'] == 'lost_flowers'}
+    months = {event['month'] for event in events if event['kind'] == 'bouquet_closed'}
+
+    bouquets = {}
+    if bouquet_keys:
+        source = load_bouquets_with_archive(store, months)
+        for chat_id_key, bouquet_key in sorted(bouquet_keys, key=lambda item: item[1]):
+            bouquet_data = source.get(chat_id_key, {}).get(bouquet_key)
+            if bouquet_data is not None:
+                bouquets.setdefault(chat_id_key, {})[bouquet_key] = bouquet_data
+
+    lost_flowers = {}
+    if lost_keys:
+        store.refresh()
+        source = store.lost_flowers_copy()
+        for chat_id_key, timestamp in sorted(lost_keys, key=lambda item: item[1]):
+            flowers_info = source.get(chat_id_key, {}).get(timestamp)
+            if flowers_info is not None:
+                lost_flowers.setdefault(chat_id_key, {})[timestamp] = flowers_info
+    return bouquets, lost_flowers
+
+
+def build_report_artifact(store: Store, kind: str) -> str:
+    """
+    Собирает готовый отчет в папку reports магазина (только по расписанию:
+    /report отдает отчеты из этой папки как готовые).
+
+    Args:
+        store (Store): Данные магазина.
+        kind (str): 'daily' - полный отчет, 'weekly' - события за последние 7 дней.
+
+    Returns:
+        str: Путь к отчету.
+    """
+    reports_dir = shop_path(store, REPORTS_DIR)
+    os.makedirs(reports_dir, exist_ok=True)
+    now = datetime.now()
+    file_name = f"{kind}_{now.strftime('%Y-%m-%d_%H%M')}.xlsx"
+    path = os.path.join(reports_dir, file_name)
+    since = now - timedelta(days=7) if kind == 'weekly' else None
+
+    # Пишем во временный файл, чтобы /report не отдал недописанный отчет
+    tmp_path = os.path.join(reports_dir, 'tmp_' + file_name)
+    generate_report(store, report_format='xlsx', path=tmp_path, since=since)
+    os.replace(tmp_path, path)
+
+    for old_path in sorted(report_artifacts(store, kind))[:-REPORT_KEEP]:
+        os.remove(old_path)
+    return path
+
+
+def report_artifacts(store: Store, kind: str) -> List[str]:
+    reports_dir = shop_path(store, REPORTS_DIR)
+    try:
+        names = os.listdir(reports_dir)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(reports_dir, name) for name in names
+            if name.startswith(kind + '_') and name.endswith('.xlsx')]
+
+
+def artifact_built_at(path: str) -> datetime:
+    """Время сборки готового отчета из имени файла (<kind>_YYYY-MM-DD_HHMM.xlsx)."""
+    stamp = os.path.basename(path).split('_', 1)[1][:-len('.xlsx')]
+    return datetime.strptime(stamp, '%Y-%m-%d_%H%M')
+
+
+def format_built_at(built_at: datetime) -> str:
+    """Время сборки для подписи: без даты, если отчет собран сегодня."""
+    return built_at.strftime('%H:%M' if built_at.date() == datetime.now().date() else '%d.%m %H:%M')
+
+
+def latest_report_artifact(store: Store, kind: str) -> Optional[str]:
+    """Возвращает самый новый готовый отчет, если он еще не устарел."""
+    max_age = timedelta(hours=REPORT_MAX_AGE_HOURS) if kind == 'daily' else timedelta(days=7)
+    artifacts = report_artifacts(store, kind)
+    if not artifacts:
+        return None
+    path = max(artifacts)
+    if datetime.now() - artifact_built_at(path) > max_age:
+        return None
+    return path
+
+
+def run_scheduled_reports() -> None:
+    """Собирает ежедневный (и в нужный день недельный) отчет каждого магазина и рассылает его админам."""
+    kinds = ['daily'] + (['weekly'] if datetime.now().weekday() == REPORT_WEEKLY_DAY else [])
+    for shop, store in shards.stores().items():
+        for kind in kinds:
+            push_report(shop, store, kind)
+
+
+def push_report(shop: str, store: Store, kind: str) -> None:
+    try:
+        path = build_report_artifact(store, kind)
+        logger.info('Готовый отчет собран: %s', path)
+    except Exception:
+        logger.exception('Не удалось собрать отчет %s магазина %s', kind, shop)
+        return
+    if not REPORT_PUSH:
+        return
+    for admin in store.users.role('admins'):
+        admin_chat_id = int(admin['chat_id'])
+        try:
+            with open(path, 'rb') as file:
+                bot.send_document(admin_chat_id, file, caption=f'Отчет по расписанию ({kind})')
+        except Exception:
+            logger.exception('Не удалось отправить отчет админу %s', admin_chat_id)
+
+
+def report_scheduler() -> None:
+    """Фоновый цикл: раз в сутки в REPORT_SCHEDULE_TIME собирает готовые отчеты."""
+    hour, minute = map(int, REPORT_SCHEDULE_TIME.split(':'))
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        time.sleep((next_run - now).total_seconds())
+        run_scheduled_reports()
 
 ######################################
+@bot.message_handler(commands=['losses'])
+@instrument
+@require_admin
+def losses_command(message):
+    """Показывает потери цветов за неделю и месяц и отмечает необычный рост за неделю."""
+    # numpy нужен только этой команде
+    import analytics
+
+    store = shards.store_for(message.chat.id)
+    flower = message.text.partition(' ')[2].strip()
+    try:
+        summary = analytics.get_loss_series(store).summary()
+    except Exception as e:
+        bot.reply_to(message, f'Произошла ошибка при расчете потерь: {e}')
+        return
+    if flower:
+        flower = analytics.normalize_flower(flower)
+        summary = [row for row in summary if row['flower'] == flower]
+    if not summary:
+        bot.reply_to(message, 'Потерь за последние полгода нет.')
+        return
+
+    names = store.users.names()
+    lines = [f'Потери, шт.: {analytics.SHORT_WINDOW} дн. / {analytics.LONG_WINDOW} дн.']
+    for row in summary[:20]:
+        line = f"- {row['flower']}: {row['week']} / {row['month']}"
+        if row['flagged']:
+            growth = f"x{row['ratio']:.1f} к обычной неделе" if row['ratio'] else 'раньше потерь не было'
+            sellers = ', '.join(f'{names.get(chat_id, chat_id)} {quantity}' for chat_id, quantity in row['top_sellers'])
+            line += f' ⚠ рост: {growth} (больше всего: {sellers})'
+        lines.append(line)
+    bot.reply_to(message, '\n'.join(lines))
+
+
+@bot.message_handler(commands=['metrics'])
+@instrument
+@require_admin
+def metrics_command(message):
+    """Отправляет сводку метрик админ-бота и бота продавцов."""
+    snapshot = metrics.REGISTRY.snapshot()
+    text = f"Метрики процесса:\n{metrics.render_text(snapshot)}"
+    # В общем процессе (run_bots.py) метрики продавцов уже в реестре
+    if any(labels.get('bot') == 'seller' for _, labels, _ in snapshot['histograms']):
+        bot.reply_to(message, text)
+        return
+    try:
+        with open(SELLER_METRICS_FILE, 'r', encoding='utf-8') as file:
+            seller_snapshot = json.load(file)
+        age = int(time.time() - seller_snapshot['taken_at'])
+        text += f"\n\nБот продавцов (данные {age} с назад):\n{metrics.render_text(seller_snapshot)}"
+    except FileNotFoundError:
+        text += '\n\nМетрики бота продавцов пока не сохранены.'
+    bot.reply_to(message, text)
+
+
+@bot.message_handler(commands=['profile'])
+@instrument
+@require_admin
+def profile_command(message):
+    """Включает профилирование следующих N вызовов обработчиков или на N секунд."""
+    chat_id = message.chat.id
+    args = message.text.split()[1:]
+
+    try:
+        calls, seconds = profiling.parse_limit(args[0] if args else '20')
+    except ValueError:
+        bot.reply_to(message, 'Используйте формат: /profile 20 (вызовов) или /profile 60s (секунд)')
+        return
+
+    def send_profile(path):
+        with open(path, 'rb') as file:
+            bot.send_document(chat_id, file, caption='Результат профилирования')
+
+    try:
+        profiling.start('admin', PROFILES_DIR, calls=calls, seconds=seconds, on_finish=send_profile)
+    except (RuntimeError, ValueError) as e:
+        bot.reply_to(message, str(e))
+        return
+
+    limit = f'{calls} вызовов' if calls else f'{seconds:g} с'
+    bot.reply_to(message, f'Профилирование включено на {limit}.')
+
+
+@bot.message_handler(commands=['backup'])
+@instrument
+@require_admin
+def backup_command(message):
+    """Снимает резервную копию данных магазина."""
+    try:
+        path = backups.take_snapshot(shards.store_for(message.chat.id))
+        size_kb = os.path.getsize(path) / 1024
+        bot.reply_to(message, f'Резервная копия сохранена: {os.path.basename(path)} ({size_kb:.0f} КБ)')
+    except Exception as e:
+        bot.reply_to(message, f'Не удалось снять резервную копию: {e}')
+
+
+@bot.message_handler(commands=['restore'])
+@instrument
+@require_admin
+def restore_command(message):
+    """Показывает резервные копии или готовит восстановление на указанный момент."""
+    store = shards.store_for(message.chat.id)
+    arg = message.text.partition(' ')[2].strip()
+    if not arg:
+        snapshots = backups.list_snapshots(store)[-10:]
+        if not snapshots:
+            bot.reply_to(message, 'Резервных копий пока нет.')
+            return
+        lines = [taken_at.strftime('%Y-%m-%d %H:%M:%S') for taken_at, _ in snapshots]
+        bot.reply_to(message, 'Последние копии:\n' + '\n'.join(lines) +
+                     '\n\nИспользуйте /restore ГГГГ-ММ-ДД ЧЧ:ММ')
+        return
+
+    try:
+        at = datetime.fromisoformat(arg.replace(' ', 'T'))
+    except ValueError:
+        bot.reply_to(message, 'Используйте формат: /restore 2024-05-01 18:00')
+        return
+    bot.reply_to(message, f"Данные магазина будут возвращены к последней копии до {at.strftime('%Y-%m-%d %H:%M')}. "
+                          f"Изменения после нее пропадут (текущее состояние тоже сохранится в копию).\n"
+                          f"Напишите да или нет")
+    bot.register_next_step_handler(message, confirm_restore, at)
+
+
+@instrument
+def confirm_restore(message, at):
+    """Восстанавливает данные магазина после подтверждения."""
+    if message.text.lower() not in ('да', 'восстановить'):
+        bot.reply_to(message, 'Восстановление отменено.')
+        return
+    try:
+        source = backups.restore_snapshot(shards.store_for(message.chat.id), at)
+        bot.reply_to(message, f'Данные восстановлены из копии {os.path.basename(source)}.')
+    except Exception as e:
+        bot.reply_to(message, f'Не удалось восстановить данные: {e}')
+
+
 @bot.message_handler(commands=['add_user'])
+@instrument
 @require_admin
 def add_user_command(message):
     """
@@ -245,6 +570,7 @@ def add_user_command(message):
 #     bot.register_next_step_handler(message, process_user_id, role)
 
 
+@instrument
 def process_user_id(message, role):
     """
     Запрашивает имя пользователя.
@@ -262,11 +588,8 @@ def process_user_id(message, role):
     cancel_button = types.InlineKeyboardButton("Отмена", callback_data='cancel')
     keyboard.add(cancel_button)
     
-    #Проверим, что его еще нет в списке пользователей
-    admins_list_actual = [admin['chat_id'] for admin in admin_users_handler.load()['admins']]
-    users_list_actual = [user['chat_id'] for user in admin_users_handler.load()['users']]
-    
-    if new_user_id in users_list_actual + admins_list_actual:
+    #Проверим, что его еще нет в списке пользователей (ни в одном магазине)
+    if shards.shop_for(new_user_id) is not None:
         bot.reply_to(message, 'Этот id уже есть в списке пользователей')
         return
     
@@ -278,6 +601,7 @@ def process_user_id(message, role):
         bot.register_next_step_handler(message, process_user_id, role)
 
     
+@instrument
 def process_admin_user_file(message, role, new_user_id):
     """
     Сохраняет информацию о пользователе в JSON-файле.
@@ -295,15 +619,8 @@ def process_admin_user_file(message, role, new_user_id):
     
     try:
         int(new_user_id)   ##### ПОТОМ ДОПИШИ НОРМАЛЬНО
-        # Загружаем данные из JSON-файла
-        users_data = admin_users_handler.load()
-
-        # Добавляем нового пользователя
-        new_user = {"chat_id": new_user_id, "name": username}
-        users_data[role].append(new_user)
-
-        # Сохраняем обновленные данные
-        admin_users_handler.save(users_data)
+        # Добавляем нового пользователя и сохраняем обновленные данные
+        shards.store_for(message.chat.id).users.add(role, new_user_id, username)
 
         bot.reply_to(message, f'Пользователь {username} ({new_user_id}) добавлен с ролью {role}')
     except Exception as e:
@@ -312,6 +629,7 @@ def process_admin_user_file(message, role, new_user_id):
 
 ####################################################
 @bot.message_handler(commands=['del_user'])
+@instrument
 @require_admin
 def del_user_command(message):
     """
@@ -331,6 +649,7 @@ def del_user_command(message):
     bot.register_next_step_handler(message, process_user_id_for_del)
 
 
+@instrument
 def process_user_id_for_del(message):
     """
     Запрашивает подтверждение удаления пользователя.
@@ -344,10 +663,7 @@ def process_user_id_for_del(message):
     
     user_id_to_del = message.text 
     #Проверим, что id есть списке пользователей
-    admins_list_actual = [admin['chat_id'] for admin in admin_users_handler.load()['admins']]
-    users_list_actual = [user['chat_id'] for user in admin_users_handler.load()['users']]
-    
-    if user_id_to_del not in users_list_actual + admins_list_actual:
+    if user_id_to_del not in shards.store_for(message.chat.id).users:
         bot.reply_to(message, 'Этого пользователя и так нет в списке')
         return
     
@@ -358,6 +674,7 @@ def process_user_id_for_del(message):
         bot.reply_to(message, 'Пожалуйста, введите корректный id в виде числа')
 
 
+@instrument
 def confirm_user_deletion(message, user_id):
     """
     Удаляет пользователя из JSON-файла.
@@ -373,36 +690,29 @@ def confirm_user_deletion(message, user_id):
 
     if confirmation in ('да', 'удалить'):
         try:
-            delete_user(user_id)
+            delete_user(shards.store_for(message.chat.id), user_id)
             bot.reply_to(message, f'Пользователь {user_id} удален.')
         except Exception as e:
             bot.reply_to(message, f'Ошибка при удалении пользователя: {e}')
     else:
         bot.reply_to(message, 'Удаление пользователя отменено.')
 
-def delete_user(user_id):
+def delete_user(store, user_id):
     """
     Удаляет пользователя из JSON-файла по chat_id.
 
     Args:
+        store (Store): Данные магазина админа.
         chat_id (int): ID чата пользователя Telegram.
 
     Returns:
         None.
     """
-    # Загружаем данные из JSON-файла
-    data = admin_users_handler.load()
-
-    # Находим пользователя в списке "admins"
-    for user in data["users"]:
-        if user["chat_id"] == str(user_id): ####### Исправить потом
-            data["users"].remove(user)
-            break
-
-    # Сохраняем обновленные данные
-    admin_users_handler.save(data)
+    # Удаляем из списка "users" и сохраняем обновленные данные
+    store.users.delete(user_id, 'users')
 
 @bot.message_handler(commands=['users_list'])
+@instrument
 @require_admin
 def show_users_command(message):
     """
@@ -414,12 +724,10 @@ def show_users_command(message):
     Returns:
         None.
     """
-    # Загружаем данные из JSON-файла
     try:
-        data = admin_users_handler.load()
-
-        admins_text = get_users_info(data["admins"])
-        users_text = get_users_info(data["users"])
+        user_directory = shards.store_for(message.chat.id).users
+        admins_text = get_users_info(user_directory.role("admins"))
+        users_text = get_users_info(user_directory.role("users"))
 
         text = f"**Администраторы:**\n{admins_text}\n\n**Пользователи:**\n{users_text}"
         bot.reply_to(message, text, parse_mode='Markdown')
@@ -448,6 +756,17 @@ def get_users_info(users):
 
 #####################################
 
+def start_services() -> None:
+    """Запускает фоновые сервисы админ-бота: метрики, сторож зависаний и расписание отчетов."""
+    metrics.start_dump_thread(METRICS_FILE)
+    # Состояние цикла опроса и очереди обработчиков: /healthz и сторож зависаний
+    health.watch(bot, 'admin', logger, HEALTH_RESTART_SECONDS)
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+    threading.Thread(target=report_scheduler, name='report-scheduler', daemon=True).start()
+
+
 if __name__ == "__main__":
-    
+    start_services()
+
     bot.polling(none_stop=True)
\ No newline at end of file
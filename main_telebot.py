@@ -1,67 +1,74 @@
 import os
+import re
 import json
-import pandas as pd
+import sys
+import signal
+import threading
 from datetime import datetime
 import telebot
 from telebot import types
 from decouple import config
-from openpyxl import Workbook
-from functools import partial
+from functools import partial, wraps
 from typing import Dict, Any
 import logging
 
+import metrics
+import health
+import backups
+import profiling
+from indexes import BoundedLRU
+from shops import ShardMap
+import flowers
+
 # Константы
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
-BOUQUETS_FILE = os.path.join(DATA_DIR, 'bouquets.json')
-LOST_FLOWERS_FILE = os.path.join(DATA_DIR, 'lost_flowers.json')
-REPORT_FILE = os.path.join(DATA_DIR, 'report.xlsx')
-ADMIN_USERS_FILE = os.path.join(DATA_DIR, 'admin_users.json')
+METRICS_FILE = os.path.join(DATA_DIR, 'metrics_seller.json')
+PROFILES_DIR = os.path.join(DATA_DIR, 'profiles')
+FLOWER_CATALOG_FILE = os.path.join(DATA_DIR, 'flower_catalog.json')
+SHOPS_FILE = os.path.join(DATA_DIR, 'shops.json')
+# Сколько букетов показывают /my_bouquets и /find (ограничения длины сообщения и кнопок Telegram)
+MY_BOUQUETS_LIMIT = 30
+FIND_LIMIT = 30
 TOKEN = config('TELEGRAM_BOT_TOKEN')
+METRICS_PORT = config('METRICS_PORT', default=0, cast=int)
+PROFILE_LIMIT = config('PROFILE_LIMIT', default='50')
+SHOP_WORKER = config('SHOP_WORKER', default=0, cast=int)
+# Через сколько секунд зависания цикла опроса завершать процесс для перезапуска (0 - не завершать)
+HEALTH_RESTART_SECONDS = config('HEALTH_RESTART_SECONDS', default=0, cast=int)
+# Резервные копии данных: период (0 - выключены), сколько последних копий
+# и за сколько дней (по последней копии дня) хранить
+BACKUP_INTERVAL_MINUTES = config('BACKUP_INTERVAL_MINUTES', default=60, cast=int)
+BACKUP_KEEP_LAST = config('BACKUP_KEEP_LAST', default=24, cast=int)
+BACKUP_KEEP_DAYS = config('BACKUP_KEEP_DAYS', default=30, cast=int)
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler = logging.FileHandler(os.path.join(BASE_DIR, 'bot.log'), encoding='utf-8', mode='w')
+file_handler = logging.FileHandler(os.path.join(BASE_DIR, 'bot.log'), encoding='utf-8', mode='a')
 file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
 # Инициализация бота
 bot = telebot.TeleBot(TOKEN)
+instrument = metrics.instrument('seller')
 
-class DataHandler:
-    def __init__(self, file_path: str):
-        self.file_path = file_path
-
-    def load(self) -> Dict[str, Any]:
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return {}
-
-    def save(self, data: Dict[str, Any]) -> None:
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
-
+# Магазины этого процесса; данные каждого - в его Store (см. shops.py, store.py)
+shards = ShardMap.load(SHOPS_FILE, DATA_DIR, SHOP_WORKER)
+flowers.CATALOG.load(FLOWER_CATALOG_FILE)
+# Недавние callback-запросы и букеты, уже взятые в обработку (защита от повторных нажатий)
+seen_callbacks = BoundedLRU(4096)
+claimed_bouquets = BoundedLRU(4096)
 
-# Инициализация обработчиков данных
-bouquets_handler = DataHandler(BOUQUETS_FILE)
-lost_flowers_handler = DataHandler(LOST_FLOWERS_FILE)
-admin_users_handler = DataHandler(ADMIN_USERS_FILE)
-
-# Загрузка данных
-bouquets = bouquets_handler.load()
-lost_flowers = lost_flowers_handler.load()
-admin_users = admin_users_handler.load()
-ADMIN_CHAT_ID = [int(admin['chat_id']) for admin in admin_users['admins']]
-USER_CHAT_ID = [int(user['chat_id']) for user in admin_users['users']]
 
 def require_admin(func):
     """Декоратор для ограничения доступа к команде неадминистраторам."""
+    @wraps(func)
     def wrapper(message, *args, **kwargs):
-        if message.chat.id not in ADMIN_CHAT_ID:
+        store = shards.store_for(message.chat.id)
+        user = store.users.get(message.chat.id) if store is not None else None
+        if user is None or user['role'] != 'admins':
             bot.reply_to(message, 'У вас нет прав доступа к этой команде.')
             return
         return func(message, *args, **kwargs)
@@ -69,15 +76,20 @@ def require_admin(func):
 
 def require_user(func):
     """Декоратор для ограничения доступа к команде не юзерам."""
+    @wraps(func)
     def wrapper(message, *args, **kwargs):
-        if message.chat.id not in USER_CHAT_ID + ADMIN_CHAT_ID:
+        store = shards.store_for(message.chat.id)
+        if store is None:
             bot.reply_to(message, 'У вас нет прав доступа к этой команде.')
             return
+        # Подхватываем изменения другого процесса (например, восстановление из копии)
+        store.refresh()
         return func(message, *args, **kwargs)
     return wrapper
 
 
 @bot.callback_query_handler(func=lambda call: call.data == 'cancel')
+@instrument
 def cancel_callback(call):
     """Обрабатывает нажатие кнопки "Отменить"."""
     chat_id = call.message.chat.id
@@ -87,6 +99,7 @@ def cancel_callback(call):
     
     
 @bot.message_handler(commands=['start'])
+@instrument
 @require_user
 def start_command(message):
     # """Приветствует пользователя и объясняет назначение бота."""
@@ -101,6 +114,7 @@ def start_command(message):
 
 
 @bot.message_handler(commands=['help'])
+@instrument
 @require_user
 def help_command(message):
     """Предоставляет информацию о командах бота."""
@@ -112,6 +126,8 @@ def help_command(message):
     - /add_bouquet: Добавит новый букет в вашу базу данных.
     - /add_lost_flowers: Зарегистрирует пропавшие цветы.
     - /sell_bouquet: Учтет проданный букет
+    - /find цветок [количество], ...: Найдет непроданные букеты по составу
+    - /my_bouquets: Покажет ваши непроданные букеты
 
     Пожалуйста, вводите команды в точности так, как они указаны.
     """
@@ -119,6 +135,7 @@ def help_command(message):
 
 
 @bot.message_handler(commands=['add_bouquet'])
+@instrument
 @require_user
 def add_bouquet_command(message):
     """Инициирует процесс добавления нового букета."""
@@ -129,14 +146,17 @@ def add_bouquet_command(message):
     
     chat_id = message.chat.id
     bouquet_key = datetime.now().isoformat() ## Пока только время
+    store = shards.store_for(chat_id)
 
-    # Создает новый словарь букета для текущего чата
-    bouquets.setdefault(chat_id, {})[bouquet_key] = {'price': 0, 'composition': {}}
+    # Создает новый словарь букета для текущего чата (chat_id - строкой, как в JSON)
+    with store.lock:
+        store.bouquets.setdefault(str(chat_id), {})[bouquet_key] = {'price': 0, 'composition': {}}
 
     bot.reply_to(message, 'Введите стоимость нового букета:', reply_markup=keyboard)
     bot.register_next_step_handler(message, get_bouquet_price, bouquet_key)
 
 
+@instrument
 def get_bouquet_price(message, bouquet_key):
     """Получает цену букета и переходит к вводу состава."""
     chat_id = message.chat.id
@@ -148,7 +168,15 @@ def get_bouquet_price(message, bouquet_key):
     try:
         msg = '''Введите состав букета в формате \nцвет1 количество1 \nцвет2 количество2 \nи т.д.'''
         price = float(message.text.replace(',', '.'))
-        bouquets[chat_id][bouquet_key]['price'] = price
+        store = shards.store_for(chat_id)
+        with store.lock:
+            store.refresh()
+            bouquet_data = store.bouquets.get(str(chat_id), {}).get(bouquet_key)
+            if bouquet_data is not None:
+                bouquet_data['price'] = price
+        if bouquet_data is None:
+            bot.reply_to(message, 'Склад изменился, добавьте букет заново: /add_bouquet')
+            return
         bot.reply_to(message, msg, reply_markup=keyboard)
         bot.register_next_step_handler(message, get_composition, bouquet_key)
     except ValueError:
@@ -156,6 +184,7 @@ def get_bouquet_price(message, bouquet_key):
         bot.register_next_step_handler(message, get_bouquet_price, bouquet_key)
 
 
+@instrument
 def get_composition(message, bouquet_key):
     """
     Получает состав букета и сохраняет данные.
@@ -173,33 +202,39 @@ def get_composition(message, bouquet_key):
     cancel_button = types.InlineKeyboardButton("Отмена", callback_data='cancel')
     keyboard.add(cancel_button)
     
-    composition_text = message.text
-    composition_items = [item.strip() for item in composition_text.split('\n')]
-
-    is_valid_composition = True
-
-    for item in composition_items:
-        try:
-            flower, quantity = " ".join(item.split(' ')[:-1]).strip(), item.split(' ')[-1]
-            assert flower != ''
-            assert not any(char.isdigit() for char in flower)
-            bouquets[chat_id][bouquet_key]['composition'][flower.strip()] = int(quantity)
-            bouquets[chat_id][bouquet_key]['sold_flag'] = 0
-            bouquets[chat_id][bouquet_key]['is_lost'] = 0
-            bouquets[chat_id][bouquet_key]['seller_id'] = ''
-            bouquets[chat_id][bouquet_key]['sold_lost_date'] = ''
-
-        except Exception:
-            is_valid_composition = False
-            bot.reply_to(message, 'Некорректный формат ввода. \nИспользуйте формат: \nцвет1 количество1 \nцвет2 количество2 \nи т.д.', reply_markup=keyboard)
-            bot.register_next_step_handler(message, get_composition, bouquet_key)
-    
-    if is_valid_composition:
-        bot.reply_to(message, 'Букет успешно добавлен!')
-        bouquets_handler.save(bouquets)
+    composition, errors = flowers.parse_composition(message.text)
+
+    if errors:
+        bot.reply_to(message, 'Некорректный формат ввода. \nИспользуйте формат: \nцвет1 количество1 \nцвет2 количество2 \nи т.д.', reply_markup=keyboard)
+        bot.register_next_step_handler(message, get_composition, bouquet_key)
+        return
+
+    store = shards.store_for(chat_id)
+    with store.lock:
+        # Черновик букета пропадает, если склад перечитан после восстановления из копии
+        store.refresh()
+        bouquet_data = store.bouquets.get(str(chat_id), {}).get(bouquet_key)
+        if bouquet_data is not None:
+            bouquet_data['composition'] = composition
+            bouquet_data['sold_flag'] = 0
+            bouquet_data['is_lost'] = 0
+            bouquet_data['seller_id'] = ''
+            bouquet_data['sold_lost_date'] = ''
+            saved = store.save_bouquets()
+        else:
+            saved = False
+        if saved:
+            store.stock_index.add(str(chat_id), bouquet_key, bouquet_data)
+            store.journal.append('bouquet_created', chat_id, bouquet_key)
+
+    if not saved:
+        bot.reply_to(message, 'Склад изменился, добавьте букет заново: /add_bouquet')
+        return
+    bot.reply_to(message, 'Букет успешно добавлен!')
 
 
 @bot.message_handler(commands=['add_lost_flowers'])
+@instrument
 @require_user
 def add_lost_flowers_command(message):
     """Инициирует процесс добавления информации о пропавших цветах."""
@@ -211,13 +246,16 @@ def add_lost_flowers_command(message):
     keyboard.add(cancel_button)
     
     # Создает новый словарь пропавших цветов для текущего чата
-    lost_flowers.setdefault(chat_id, {})[timestamp] = {}
+    store = shards.store_for(chat_id)
+    with store.lock:
+        store.lost_flowers.setdefault(str(chat_id), {})[timestamp] = {}
     
     bot.reply_to(message, 'Введите состав букета в формате \nцвет1 количество1 \nцвет2 количество2 \nи т.д.', reply_markup=keyboard)
     bot.register_next_step_handler(message, get_lost_flowers, timestamp)
     
 
 
+@instrument
 def get_lost_flowers(message, timestamp):
     """Получает информацию о пропавших цветах и сохраняет данные."""
     chat_id = message.chat.id
@@ -226,29 +264,31 @@ def get_lost_flowers(message, timestamp):
     cancel_button = types.InlineKeyboardButton("Отмена", callback_data='cancel')
     keyboard.add(cancel_button)
     
-    lost_flowers_text = message.text
-    lost_flowers_items = [item.strip() for item in lost_flowers_text.split('\n')]
-
-    for item in lost_flowers_items:
-        try:
-            flower, quantity = " ".join(item.split(' ')[:-1]).strip(), item.split(' ')[-1]
-            assert flower != ''
-            assert not any(char.isdigit() for char in flower)
-            # parts = item.split('-')
-            # flower, quantity = parts[0].strip(), parts[1].strip()
-            lost_flowers.setdefault(chat_id, {}).setdefault(timestamp, {})[flower] = int(quantity)
-        except Exception:
-            bot.reply_to(message, '''Некорректный формат ввода \nИспользуйте формат: \nцвет1 количество1 \nцвет2 количество2 \nи т.д.''', reply_markup=keyboard)
-            bot.register_next_step_handler(message, get_lost_flowers, timestamp)
-            return
+    composition, errors = flowers.parse_composition(message.text)
 
+    if errors:
+        bot.reply_to(message, '''Некорректный формат ввода \nИспользуйте формат: \nцвет1 количество1 \nцвет2 количество2 \nи т.д.''', reply_markup=keyboard)
+        bot.register_next_step_handler(message, get_lost_flowers, timestamp)
+        return
+
+    store = shards.store_for(chat_id)
+    with store.lock:
+        store.refresh()
+        store.lost_flowers.setdefault(str(chat_id), {})[timestamp] = composition
+        saved = store.save_lost_flowers()
+        if saved:
+            store.journal.append('lost_flowers', chat_id, timestamp)
+
+    if not saved:
+        bot.reply_to(message, 'Данные изменились, внесите пропавшие цветы заново: /add_lost_flowers')
+        return
     bot.reply_to(message, 'Пропавшие цветы успешно учтены!')
-    lost_flowers_handler.save(lost_flowers)
 
 
 
 
 @bot.message_handler(commands=['sell_bouquet', 'lost_bouquet'])
+@instrument
 @require_user
 def process_bouquet_command(message):
     chat_id = message.chat.id
@@ -271,6 +311,7 @@ def process_bouquet_command(message):
     bot.send_message(chat_id, f'Введите цену букета:', reply_markup=keyboard)
     bot.register_next_step_handler(message, partial(find_bouquets_by_price, field=field))
 
+@instrument
 def find_bouquets_by_price(message, field):
     """Находит букеты с указанной ценой и выводит их список."""
     chat_id = message.chat.id
@@ -282,7 +323,8 @@ def find_bouquets_by_price(message, field):
     try:
         price = float(message.text.replace(',', '.'))
         matching_bouquets = []
-        for chat_id_key, bouquets_info in bouquets.items():
+        store = shards.store_for(chat_id)
+        for chat_id_key, bouquets_info in store.bouquets.items():
             for timestamp, bouquet_data in bouquets_info.items():
                 if  (bouquet_data["sold_flag"] == 0 and bouquet_data["is_lost"] == 0) and bouquet_data["price"] == price:
                     matching_bouquets.append((timestamp, bouquet_data))
@@ -295,9 +337,10 @@ def find_bouquets_by_price(message, field):
     except ValueError:
         bot.send_message(chat_id, 'Пожалуйста, введите корректную цену в виде числа.', reply_markup=keyboard)
 
-def display_bouquets_list(message, matching_bouquets, field):
+def display_bouquets_list(message, matching_bouquets, field, hidden=0):
     """Выводит список букетов с указанной ценой.
-        chat_id здесь совпадает с seller_chat_id"""
+        chat_id здесь совпадает с seller_chat_id
+        hidden - сколько найденных букетов не вошло в список"""
     chat_id = message.chat.id
     keyboard = types.InlineKeyboardMarkup()
     text = 'Выберите букет:\n\n'
@@ -308,34 +351,181 @@ def display_bouquets_list(message, matching_bouquets, field):
 
         callback_data = json.dumps((chat_id, matching_bouquets[i-1][0], field))
         keyboard.add(types.InlineKeyboardButton(i, callback_data=callback_data))
+    if hidden:
+        text += f'И еще {hidden}. Уточните состав в /find.'
 
     cancel_button = types.InlineKeyboardButton("Отмена", callback_data='cancel')
     keyboard.add(cancel_button)
     bot.send_message(chat_id, text, reply_markup=keyboard)
 
 
+def parse_find_terms(text):
+    """
+    Разбирает условия поиска вида 'пион 7, эвкалипт'.
+
+    Args:
+        text (str): Условия через запятую или с новой строки.
+
+    Returns:
+        list: Пары (цветок, количество или None).
+    """
+    terms = []
+    for part in re.split(r'[,\n]', text):
+        words = part.split()
+        if not words:
+            continue
+        if len(words) > 1 and words[-1].isdigit():
+            terms.append((' '.join(words[:-1]), int(words[-1])))
+        elif len(words) > 1 and words[0].isdigit():
+            terms.append((' '.join(words[1:]), int(words[0])))
+        else:
+            terms.append((' '.join(words), None))
+    return terms
+
+
+@bot.message_handler(commands=['find'])
+@instrument
+@require_user
+def find_command(message):
+    """Ищет непроданные букеты по цветам в составе через инвертированный индекс."""
+    chat_id = message.chat.id
+    terms = parse_find_terms(message.text.partition(' ')[2])
+    if not terms:
+        bot.reply_to(message, 'Используйте формат: /find цветок [количество], цветок [количество]')
+        return
+
+    store = shards.store_for(chat_id)
+    stock_index = store.stock_index
+    bouquet_keys = stock_index.find(terms)
+    matching_bouquets = [(bouquet_key, store.bouquets[stock_index.owners[bouquet_key]][bouquet_key])
+                         for bouquet_key in bouquet_keys[:FIND_LIMIT]]
+    if matching_bouquets:
+        display_bouquets_list(message, matching_bouquets, 'sold_flag', len(bouquet_keys) - len(matching_bouquets))
+    else:
+        bot.send_message(chat_id, 'Букетов с таким составом не найдено.')
+
+
+@bot.message_handler(commands=['my_bouquets'])
+@instrument
+@require_user
+def my_bouquets_command(message):
+    """Показывает доступные букеты продавца по индексу продавцов, с кнопками продажи и пропажи."""
+    chat_id = message.chat.id
+    store = shards.store_for(chat_id)
+    bouquet_keys = store.stock_index.owned_by(str(chat_id))
+    if not bouquet_keys:
+        bot.send_message(chat_id, 'У вас нет непроданных букетов.')
+        return
+
+    keyboard = types.InlineKeyboardMarkup()
+    text = 'Ваши букеты:\n\n'
+    own_bouquets = store.bouquets[str(chat_id)]
+    for i, bouquet_key in enumerate(bouquet_keys[:MY_BOUQUETS_LIMIT], 1):
+        bouquet_data = own_bouquets[bouquet_key]
+        composition_str = ', '.join(f'{k}: {v}' for k, v in bouquet_data["composition"].items())
+        text += f'{i}. {bouquet_data["price"]} руб. ({bouquet_key})\nСостав: {composition_str}\n\n'
+        keyboard.row(
+            types.InlineKeyboardButton(f'{i}. Продан', callback_data=json.dumps((chat_id, bouquet_key, 'sold_flag'))),
+            types.InlineKeyboardButton(f'{i}. Пропал', callback_data=json.dumps((chat_id, bouquet_key, 'is_lost'))))
+    if len(bouquet_keys) > MY_BOUQUETS_LIMIT:
+        text += f'И еще {len(bouquet_keys) - MY_BOUQUETS_LIMIT}. Используйте /find или /sell_bouquet.'
+
+    keyboard.add(types.InlineKeyboardButton("Отмена", callback_data='cancel'))
+    bot.send_message(chat_id, text, reply_markup=keyboard)
+
+
 @bot.callback_query_handler(func=lambda call: call.data)
+@instrument
 def select_bouquet_by_number(call):
-    """Обрабатывает выбор пользователя по номеру и помечает букет как проданный или пропавший."""
+    """
+    Обрабатывает выбор пользователя по номеру и помечает букет как проданный или пропавший.
+
+    Повторные нажатия (тот же call.id или уже учтенный букет) сразу получают
+    ответ и не трогают склад и диск.
+    """
+    if not seen_callbacks.add(call.id):
+        bot.answer_callback_query(call.id)
+        return
+
     call_data = json.loads(call.data)
     seller_chat_id = call_data[0]
+    date_time = call_data[1]
     field = call_data[2]
-    # message_text = call_data[3]
 
-    date_time = json.loads(call.data)[1]
+    store = shards.store_for(call.message.chat.id)
+    if store is None:
+        bot.answer_callback_query(call.id, 'У вас нет прав доступа к этой команде.')
+        return
+    # Подхватываем изменения другого процесса (например, восстановление из копии)
+    store.refresh()
+    # Ключи букетов - время создания, они могут совпасть в разных магазинах.
+    # После восстановления из копии растет restore_epoch, и старые отметки не мешают
+    # учесть вернувшийся на склад букет.
+    claim = (store.data_dir, store.restore_epoch, date_time)
+    chat_id_key = store.stock_index.owners.get(date_time)
+    if chat_id_key is None or not claimed_bouquets.add(claim):
+        bot.answer_callback_query(call.id, 'Этот букет уже учтен')
+        return
+    bot.answer_callback_query(call.id)
+
+    try:
+        with store.lock:
+            # Проданные и пропавшие букеты больше не нужны в текущем складе
+            archived = store.archive_bouquet(chat_id_key, date_time, **{
+                field: 1,
+                'seller_id': str(seller_chat_id),
+                'sold_lost_date': datetime.now().isoformat(),
+            })
+            if archived:
+                archived = store.save_bouquets()
+    except Exception:
+        # Даем повторить нажатие, если учесть букет не получилось
+        claimed_bouquets.discard(claim)
+        raise
+
+    if not archived:
+        claimed_bouquets.discard(claim)
+        bot.send_message(seller_chat_id, "Склад изменился, выберите букет заново")
+        return
+    bot.send_message(seller_chat_id, "Букет учтен")
 
-    for chat_id_key, bouquets_info in bouquets.items():
-        for timestamp, bouquet_data in bouquets_info.items():
-            if timestamp == date_time:
-                bouquet_data[field] = 1
-                bouquet_data['seller_id'] = str(seller_chat_id)
-                bouquet_data['sold_lost_date'] = datetime.now().isoformat()
 
-                bouquets_handler.save(bouquets)
+def start_profiling(signum=None, frame=None):
+    """
+    Включает профилирование по сигналу SIGUSR1 (kill -USR1 <pid>).
 
-                bot.send_message(seller_chat_id, "Букет учтен")
+    Лимит берется из PROFILE_LIMIT: '50' - вызовов, '60s' - секунд.
+    Результат сохраняется в папку data/profiles.
+    """
+    try:
+        calls, seconds = profiling.parse_limit(PROFILE_LIMIT)
+        profiling.start('seller', PROFILES_DIR, calls=calls, seconds=seconds)
+        logger.info('Профилирование включено (%s)', PROFILE_LIMIT)
+    except (RuntimeError, ValueError) as e:
+        logger.warning(str(e))
+
+
+def start_services() -> None:
+    """Готовит данные и запускает фоновые сервисы бота продавцов."""
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, start_profiling)
+    if '--profile' in sys.argv:
+        start_profiling()
+    for shop, store in shards.stores().items():
+        archived = store.archive_closed_bouquets()
+        if archived:
+            logger.info('Магазин %s: перенесено в архив букетов: %s', shop, archived)
+    metrics.start_dump_thread(METRICS_FILE)
+    # Состояние цикла опроса и очереди обработчиков: /healthz и сторож зависаний
+    health.watch(bot, 'seller', logger, HEALTH_RESTART_SECONDS)
+    if BACKUP_INTERVAL_MINUTES:
+        backups.start_snapshot_thread(shards.stores, BACKUP_INTERVAL_MINUTES * 60,
+                                      BACKUP_KEEP_LAST, BACKUP_KEEP_DAYS)
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
 
 
 if __name__ == "__main__":
+    start_services()
 
     bot.polling(none_stop=True)
\ No newline at end of file
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import logging
+import threading
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple, Any
+
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек, в секундах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (как в Prometheus)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                'sum': self.sum, 'count': self.count}
+
+
+class Registry:
+    """Потокобезопасное хранилище счетчиков и гистограмм процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Возвращает JSON-совместимый срез всех метрик."""
+        with self._lock:
+            return {
+                'taken_at': time.time(),
+                'counters': [[name, dict(labels), value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), histogram.to_dict()]
+                               for (name, labels), histogram in self._histograms.items()],
+            }
+
+    def dump(self, path: str) -> None:
+        """Атомарно записывает срез метрик в файл (для чтения другим процессом)."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.snapshot(), file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+
+def instrument(bot_name: str) -> Callable:
+    """
+    Создает декоратор, считающий вызовы, ошибки и задержку обработчика.
+
+    Args:
+        bot_name (str): Метка бота ('seller' или 'admin').
+
+    Returns:
+        Callable: Декоратор для обработчиков и step-обработчиков telebot.
+    """
+    def decorator(func):
+        labels = {'bot': bot_name, 'handler': func.__name__}
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                session = profiling.current()
+                if session is not None:
+                    return session.runcall(func, *args, **kwargs)
+                return func(*args, **kwargs)
+            except Exception:
+                REGISTRY.inc('handler_errors_total', **labels)
+                raise
+            finally:
+                REGISTRY.inc('handler_calls_total', **labels)
+                REGISTRY.observe('handler_latency_seconds', time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+def _format_labels(labels: Dict[str, Any], **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in items.items())
+    return '{' + body + '}'
+
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Форматирует срез метрик в текстовом формате Prometheus."""
+    lines = []
+    typed = set()
+    for name, labels, value in sorted(snapshot['counters'], key=lambda c: (c[0], sorted(c[1].items()))):
+        if name not in typed:
+            lines.append(f'# TYPE {name} counter')
+            typed.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    for name, labels, histogram in sorted(snapshot['histograms'], key=lambda h: (h[0], sorted(h[1].items()))):
+        if name not in typed:
+            lines.append(f'# TYPE {name} histogram')
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {histogram["count"]}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {histogram["sum"]}')
+        lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _quantile(histogram: Dict[str, Any], q: float) -> float:
+    """Оценивает квантиль по корзинам гистограммы (верхняя граница корзины)."""
+    if not histogram['count']:
+        return 0.0
+    rank = q * histogram['count']
+    cumulative = 0
+    for bound, count in zip(histogram['buckets'], histogram['counts']):
+        cumulative += count
+        if cumulative >= rank:
+            return bound
+    return float('inf')
+
+
+def render_text(snapshot: Dict[str, Any]) -> str:
+    """Формирует краткую сводку метрик для команды /metrics."""
+    counters = {(name, tuple(sorted(labels.items()))): value
+                for name, labels, value in snapshot['counters']}
+    lines = []
+    for name, labels, histogram in sorted(snapshot['histograms'], key=lambda h: (h[0], sorted(h[1].items()))):
+        key = tuple(sorted(labels.items()))
+        avg_ms = histogram['sum'] / histogram['count'] * 1000 if histogram['count'] else 0.0
+        p95_ms = _quantile(histogram, 0.95) * 1000
+        if name == 'handler_latency_seconds':
+            errors = counters.get(('handler_errors_total', key), 0)
+            lines.append(f"- {labels['bot']}.{labels['handler']}: {histogram['count']} вызовов, {int(errors)} ошибок, "
+                         f"ср. {avg_ms:.1f} мс, p95 ≤ {p95_ms:g} мс")
+        else:
+            title = ' '.join(str(v) for v in labels.values())
+            lines.append(f"- {name} {title}: {histogram['count']} раз, ср. {avg_ms:.1f} мс, p95 ≤ {p95_ms:g} мс")
+    for (name, key), value in sorted(counters.items()):
+        if name == 'storage_bytes_written_total':
+            lines.append(f"- записано в {dict(key)['file']}: {int(value)} байт")
+    return '\n'.join(lines) if lines else 'Метрик пока нет.'
+
+
+def start_dump_thread(path: str, interval: float = 30.0) -> threading.Thread:
+    """Периодически сбрасывает метрики процесса в файл в фоновом потоке."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                REGISTRY.dump(path)
+            except OSError as e:
+                logger.warning('Не удалось сохранить метрики в %s: %s', path, e)
+
+    thread = threading.Thread(target=loop, name='metrics-dump', daemon=True)
+    thread.start()
+    return thread
+
+
+# Путь -> функция, возвращающая (content_type, тело) или (content_type, тело, код ответа)
+HTTP_ROUTES: Dict[str, Callable[[], tuple]] = {
+    '/metrics': lambda: ('text/plain; version=0.0.4; charset=utf-8', render_prometheus(REGISTRY.snapshot())),
+}
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        route = HTTP_ROUTES.get(self.path.split('?', 1)[0])
+        if route is None:
+            self.send_error(404)
+            return
+        result = route()
+        content_type, body = result[:2]
+        payload = body.encode('utf-8')
+        self.send_response(result[2] if len(result) > 2 else 200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def start_http_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Запускает HTTP-эндпоинты HTTP_ROUTES (/metrics и др.) в фоновом потоке."""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info('HTTP-эндпоинт метрик запущен на %s:%s', host, port)
+    return server
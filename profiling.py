@@ -0,0 +1,149 @@
+import os
+import io
+import pstats
+import cProfile
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+# Держится, пока профилируется вызов: cProfile с Python 3.12 не допускает
+# двух включенных профилировщиков одновременно
+_profile_lock = threading.Lock()
+
+
+class ProfileSession:
+    """
+    Профилирует следующие N вызовов обработчиков или все вызовы в течение T секунд.
+
+    Каждый вызов профилируется отдельным cProfile.Profile, результаты
+    складываются в общий pstats.Stats. Одновременно профилируется один вызов;
+    обработчики в других потоках в это время выполняются без профиля.
+    """
+
+    def __init__(self, name: str, output_dir: str, calls: Optional[int] = None,
+                 seconds: Optional[float] = None, on_finish: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.output_dir = output_dir
+        self.calls = calls
+        self.seconds = seconds
+        self.on_finish = on_finish
+        self.calls_done = 0
+        self.stats = None
+        self.finished = False
+        self._lock = threading.Lock()
+        self._timer = None
+        if seconds:
+            self._timer = threading.Timer(seconds, self.finish)
+            self._timer.daemon = True
+
+    def runcall(self, func, *args, **kwargs):
+        # Занято другим потоком или внешним вызовом этого же (вложенные вызовы
+        # уже попадают в его профиль)
+        if not _profile_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Включен профилировщик не из этого модуля
+            _profile_lock.release()
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            _profile_lock.release()
+            self._collect(profile)
+
+    def _collect(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if self.finished:
+                return
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            self.calls_done += 1
+            done = self.calls is not None and self.calls_done >= self.calls
+        if done:
+            self.finish()
+
+    def finish(self) -> Optional[str]:
+        """Завершает сессию, сохраняет отчет pstats и вызывает on_finish."""
+        global _session
+        with self._lock:
+            if self.finished:
+                return None
+            self.finished = True
+            stats = self.stats
+        if self._timer is not None:
+            self._timer.cancel()
+        with _session_lock:
+            if _session is self:
+                _session = None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        buffer = io.StringIO()
+        buffer.write(f'Профиль {self.name}: {self.calls_done} вызовов\n\n')
+        if stats is not None:
+            stats.stream = buffer
+            stats.sort_stats('cumulative').print_stats(60)
+        else:
+            buffer.write('За время сессии не было ни одного вызова обработчиков.\n')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(buffer.getvalue())
+        logger.info('Профиль сохранен в %s', path)
+
+        if self.on_finish is not None:
+            try:
+                self.on_finish(path)
+            except Exception:
+                logger.exception('Ошибка при отправке профиля')
+        return path
+
+
+def start(name: str, output_dir: str, calls: Optional[int] = None, seconds: Optional[float] = None,
+          on_finish: Optional[Callable[[str], None]] = None) -> ProfileSession:
+    """
+    Запускает сессию профилирования.
+
+    Args:
+        name (str): Префикс имени файла с результатом.
+        output_dir (str): Папка для результатов.
+        calls (int): Сколько вызовов обработчиков профилировать.
+        seconds (float): Сколько секунд профилировать.
+        on_finish (Callable): Вызывается с путем к файлу результата.
+
+    Returns:
+        ProfileSession: Запущенная сессия.
+    """
+    global _session
+    if not calls and not seconds:
+        raise ValueError('Нужно указать число вызовов или длительность')
+    session = ProfileSession(name, output_dir, calls=calls, seconds=seconds, on_finish=on_finish)
+    with _session_lock:
+        if _session is not None:
+            raise RuntimeError('Профилирование уже запущено')
+        _session = session
+    if session._timer is not None:
+        session._timer.start()
+    return session
+
+
+def current() -> Optional[ProfileSession]:
+    """Возвращает активную сессию профилирования, если она есть."""
+    return _session
+
+
+def parse_limit(text: str):
+    """Разбирает аргумент вида '20' (вызовов) или '60s' (секунд)."""
+    text = text.strip().lower()
+    if text.endswith('s'):
+        return None, float(text[:-1])
+    return int(text), None
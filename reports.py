@@ -0,0 +1,209 @@
+import os
+import csv
+import gzip
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Колонки листов отчета
+BOUQUET_COLUMNS = ['chat_id', 'name', 'date', 'price', 'Название цветка',
+                   'Количество', 'sold_flag', 'is_lost', 'seller_id', 'seller_name', 'sold\\lost_date']
+LOST_COLUMNS = ['chat_id', 'name', 'timestamp', 'Название цветка', 'Количество']
+
+_pool = None
+
+
+def get_pool() -> Executor:
+    """
+    Возвращает процесс для сборки Excel-отчетов (создается при первом вызове).
+
+    Один рабочий процесс: каждый отчет - одна задача, а пул нужен, чтобы
+    вынести кодирование xlsx из процесса бота, а не чтобы ускорить его.
+    Одновременные отчеты ждут друг друга в очереди пула.
+
+    Процесс запускается через forkserver: fork многопоточного бота может
+    унаследовать чужие захваченные блокировки.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('forkserver'))
+    return _pool
+
+
+def iter_bouquet_rows(bouquets: Dict[str, Any], names: Dict[str, str]) -> Iterator[tuple]:
+    """
+    Разворачивает букеты в строки листа Bouquets (по строке на цветок).
+
+    Args:
+        bouquets (dict): Часть bouquets.json: {chat_id: {bouquet_key: bouquet}}.
+        names (dict): Имена пользователей по chat_id.
+
+    Returns:
+        Iterator: Строки в порядке BOUQUET_COLUMNS.
+    """
+    for chat_id_key, bouquets_info in bouquets.items():
+        name = names.get(str(chat_id_key))
+        for bouquet_key, bouquet_data in bouquets_info.items():
+            seller_id = bouquet_data.get('seller_id', '')
+            head = (chat_id_key, name, bouquet_key, bouquet_data['price'])
+            tail = (bouquet_data.get('sold_flag'), bouquet_data.get('is_lost'), seller_id,
+                    names.get(str(seller_id)), bouquet_data.get('sold_lost_date'))
+            for flower, quantity in bouquet_data['composition'].items():
+                yield head + (flower, quantity) + tail
+
+
+def iter_lost_rows(lost_flowers: Dict[str, Any], names: Dict[str, str]) -> Iterator[tuple]:
+    """Разворачивает пропавшие цветы в строки листа Lost_flowers (в порядке LOST_COLUMNS)."""
+    for chat_id_key, timestamps_info in lost_flowers.items():
+        name = names.get(str(chat_id_key))
+        for timestamp, flowers_info in timestamps_info.items():
+            for flower, quantity in flowers_info.items():
+                yield (chat_id_key, name, timestamp, flower, quantity)
+
+
+def bouquet_rows(bouquets: Dict[str, Any], names: Dict[str, str]) -> List[tuple]:
+    return list(iter_bouquet_rows(bouquets, names))
+
+
+def lost_rows(lost_flowers: Dict[str, Any], names: Dict[str, str]) -> List[tuple]:
+    return list(iter_lost_rows(lost_flowers, names))
+
+
+def _last_key(data: Dict[str, Any]) -> Optional[str]:
+    """Ключ последней записи - из него берется дата в названии листа."""
+    last = None
+    for info in data.values():
+        for key in info:
+            last = key
+    return last
+
+
+def _encode_xlsx(path: str, bouquets: Dict[str, Any], lost_flowers: Dict[str, Any],
+                 names: Dict[str, str]) -> str:
+    import pandas as pd
+
+    with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
+        if bouquets:
+            df = pd.DataFrame.from_records(bouquet_rows(bouquets, names), columns=BOUQUET_COLUMNS)
+            df.to_excel(writer, sheet_name=f'Bouquets_{(_last_key(bouquets) or "")[:10]}', index=False)
+        if lost_flowers:
+            df_lost = pd.DataFrame.from_records(lost_rows(lost_flowers, names), columns=LOST_COLUMNS)
+            df_lost.to_excel(writer, sheet_name=f'Lost_flowers_{(_last_key(lost_flowers) or "")[:10]}', index=False)
+    return path
+
+
+def write_xlsx(path: str, bouquets: Dict[str, Any], lost_flowers: Dict[str, Any],
+               names: Dict[str, str]) -> str:
+    """
+    Генерирует отчет в формате Excel с листами букетов и пропавших цветов.
+
+    Книга собирается целиком в процессе из пула (get_pool). Почти все время
+    отчета уходит на кодирование листов в xlsx, и в процессе бота оно держало
+    бы GIL; передача данных в пул стоит на порядки меньше.
+
+    Args:
+        path (str): Куда сохранить отчет.
+        bouquets (dict): Букеты в формате bouquets.json.
+        lost_flowers (dict): Пропавшие цветы в формате lost_flowers.json.
+        names (dict): Имена пользователей по chat_id.
+
+    Returns:
+        str: Путь к отчету.
+    """
+    return get_pool().submit(_encode_xlsx, path, bouquets, lost_flowers, names).result()
+
+
+def write_csv(dir_path: str, bouquets: Dict[str, Any], lost_flowers: Dict[str, Any],
+              names: Dict[str, str]) -> List[str]:
+    """
+    Выгружает букеты и пропавшие цветы в два CSV-файла со сжатием gzip.
+
+    Строки пишутся прямо из хранилища, без построения DataFrame.
+    Колонки совпадают с листами Excel-отчета.
+
+    Returns:
+        list: Пути к созданным файлам.
+    """
+    paths = []
+    for file_name, columns, rows in (
+            ('report_bouquets.csv.gz', BOUQUET_COLUMNS, iter_bouquet_rows(bouquets, names)),
+            ('report_lost_flowers.csv.gz', LOST_COLUMNS, iter_lost_rows(lost_flowers, names))):
+        path = os.path.join(dir_path, file_name)
+        with gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6) as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        paths.append(path)
+    return paths
+
+
+def write_parquet(dir_path: str, bouquets: Dict[str, Any], lost_flowers: Dict[str, Any],
+                  names: Dict[str, str]) -> List[str]:
+    """
+    Выгружает букеты и пропавшие цветы в два Parquet-файла (нужен pyarrow).
+
+    Колонки собираются из строк напрямую в pyarrow.Table, без pandas.
+
+    Returns:
+        list: Пути к созданным файлам.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Для выгрузки в Parquet нужен пакет pyarrow')
+
+    paths = []
+    for file_name, columns, rows in (
+            ('report_bouquets.parquet', BOUQUET_COLUMNS, iter_bouquet_rows(bouquets, names)),
+            ('report_lost_flowers.parquet', LOST_COLUMNS, iter_lost_rows(lost_flowers, names))):
+        values = list(zip(*rows)) or [()] * len(columns)
+        table_columns = {}
+        for column, column_values in zip(columns, values):
+            # chat_id в памяти бывает и int, и str - в файле всегда строка
+            if column in ('chat_id', 'seller_id'):
+                column_values = [None if value is None else str(value) for value in column_values]
+            table_columns[column] = list(column_values)
+        table = pa.table(table_columns)
+        path = os.path.join(dir_path, file_name)
+        pq.write_table(table, path, compression='zstd')
+        paths.append(path)
+    return paths
+
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    """Возвращает месяцы (YYYY-MM) с start по end включительно."""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def filter_since(bouquets: Dict[str, Any], lost_flowers: Dict[str, Any],
+                 since: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Оставляет букеты, созданные или проданные/пропавшие начиная с since,
+    и пропавшие цветы, учтенные начиная с since.
+
+    Args:
+        since (str): Момент времени в формате isoformat.
+
+    Returns:
+        tuple: (букеты, пропавшие цветы) в исходном формате.
+    """
+    bouquets_since = {}
+    for chat_id_key, bouquets_info in bouquets.items():
+        selected = {bouquet_key: bouquet_data for bouquet_key, bouquet_data in bouquets_info.items()
+                    if bouquet_key >= since or (bouquet_data.get('sold_lost_date') or '') >= since}
+        if selected:
+            bouquets_since[chat_id_key] = selected
+    lost_since = {}
+    for chat_id_key, timestamps_info in lost_flowers.items():
+        selected = {timestamp: flowers_info for timestamp, flowers_info in timestamps_info.items()
+                    if timestamp >= since}
+        if selected:
+            lost_since[chat_id_key] = selected
+    return bouquets_since, lost_since
@@ -0,0 +1,20 @@
+import threading
+
+# Оба бота в одном процессе: они получают общий Store (см. store.get_store),
+# поэтому отчеты админ-бота строятся по данным в памяти, без чтения JSON.
+import main_telebot
+import main_admin_telebot
+
+
+def main() -> None:
+    main_telebot.start_services()
+    main_admin_telebot.start_services()
+
+    admin_polling = threading.Thread(target=main_admin_telebot.bot.polling,
+                                     kwargs={'none_stop': True}, name='admin-bot', daemon=True)
+    admin_polling.start()
+    main_telebot.bot.polling(none_stop=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import json
+from typing import Dict, Any
+
+# Схема приводит данные к единым типам на границе с диском: chat_id и ключи -
+# строки, цены - float, количества - int. JSON кодируется через orjson,
+# если он установлен, иначе через стандартный json.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class SchemaError(ValueError):
+    """Данные в файле не соответствуют схеме."""
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def loads(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _merge_chats(data: Dict[Any, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Приводит chat_id верхнего уровня к строкам, объединяя записи 123 и '123'."""
+    if all(type(key) is str for key in data):
+        return data
+    merged: Dict[str, Dict[str, Any]] = {}
+    for chat_id_key, records in data.items():
+        merged.setdefault(str(chat_id_key), {}).update(records)
+    return merged
+
+
+def _quantities(raw: Dict[str, Any], where: str) -> Dict[str, int]:
+    try:
+        return {str(flower): int(quantity) for flower, quantity in raw.items()}
+    except (AttributeError, TypeError, ValueError) as e:
+        raise SchemaError(f'{where}: некорректный состав ({e})')
+
+
+class Schema:
+    """Базовая схема: данные без изменений."""
+
+    def decode(self, raw: Any) -> Any:
+        return raw
+
+    def encode(self, data: Any) -> Any:
+        return data
+
+
+class BouquetsSchema(Schema):
+    """
+    bouquets.json и архивы: {chat_id: {bouquet_key: букет}}.
+
+    Букет: price (float), composition ({цветок: int}), и, когда букет заполнен,
+    sold_flag (int), is_lost (int), seller_id (str), sold_lost_date (str).
+    """
+
+    def decode(self, raw: Any) -> Dict[str, Dict[str, Any]]:
+        if not isinstance(raw, dict):
+            raise SchemaError('букеты: ожидался объект')
+        bouquets = _merge_chats(raw)
+        for chat_id_key, bouquets_info in bouquets.items():
+            for bouquet_key, bouquet_data in bouquets_info.items():
+                # Быстрая проверка типов; перестраиваем только некорректные записи
+                if not self._is_valid(bouquet_data):
+                    bouquets_info[bouquet_key] = self._coerce(bouquet_data, f'букет {chat_id_key}/{bouquet_key}')
+        return bouquets
+
+    @staticmethod
+    def _is_valid(bouquet_data: Any) -> bool:
+        if type(bouquet_data) is not dict or type(bouquet_data.get('price')) is not float:
+            return False
+        composition = bouquet_data.get('composition')
+        if type(composition) is not dict:
+            return False
+        for quantity in composition.values():
+            if type(quantity) is not int:
+                return False
+        for field in ('sold_flag', 'is_lost'):
+            if field in bouquet_data and type(bouquet_data[field]) is not int:
+                return False
+        for field in ('seller_id', 'sold_lost_date'):
+            if field in bouquet_data and type(bouquet_data[field]) is not str:
+                return False
+        return True
+
+    @staticmethod
+    def _coerce(bouquet_data: Any, where: str) -> Dict[str, Any]:
+        try:
+            bouquet = {'price': float(bouquet_data.get('price', 0)),
+                       'composition': _quantities(bouquet_data.get('composition', {}), where)}
+            for field in ('sold_flag', 'is_lost'):
+                if field in bouquet_data:
+                    bouquet[field] = int(bouquet_data[field] or 0)
+            for field in ('seller_id', 'sold_lost_date'):
+                if field in bouquet_data:
+                    bouquet[field] = str(bouquet_data[field] or '')
+        except (AttributeError, TypeError, ValueError) as e:
+            raise SchemaError(f'{where}: {e}')
+        return bouquet
+
+    def encode(self, data: Dict[Any, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        return _merge_chats(data)
+
+
+class LostFlowersSchema(Schema):
+    """lost_flowers.json: {chat_id: {timestamp: {цветок: int}}}."""
+
+    def decode(self, raw: Any) -> Dict[str, Dict[str, Dict[str, int]]]:
+        if not isinstance(raw, dict):
+            raise SchemaError('пропавшие цветы: ожидался объект')
+        return {chat_id_key: {str(timestamp): _quantities(flowers_info, f'пропажа {chat_id_key}/{timestamp}')
+                              for timestamp, flowers_info in timestamps_info.items()}
+                for chat_id_key, timestamps_info in _merge_chats(raw).items()}
+
+    def encode(self, data: Dict[Any, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        return _merge_chats(data)
+
+
+class AdminUsersSchema(Schema):
+    """admin_users.json: {"admins": [{"chat_id": str, "name": str}], "users": [...]}."""
+
+    ROLES = ('admins', 'users')
+
+    def decode(self, raw: Any) -> Dict[str, list]:
+        if not isinstance(raw, dict):
+            raise SchemaError('пользователи: ожидался объект')
+        data = dict(raw)
+        for role in self.ROLES:
+            try:
+                data[role] = [{**user, 'chat_id': str(user['chat_id']), 'name': str(user.get('name', ''))}
+                              for user in raw.get(role, [])]
+            except (KeyError, TypeError) as e:
+                raise SchemaError(f'пользователи ({role}): {e}')
+        return data
+
+    def encode(self, data: Dict[str, list]) -> Dict[str, list]:
+        return self.decode(data)
+
+
+PLAIN = Schema()
+BOUQUETS = BouquetsSchema()
+LOST_FLOWERS = LostFlowersSchema()
+ADMIN_USERS = AdminUsersSchema()
@@ -0,0 +1,87 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from store import Store, get_store
+
+logger = logging.getLogger(__name__)
+
+
+class ShardMap:
+    """
+    Магазины (у каждого своя папка данных и свой Store) и маршрутизация чатов.
+
+    Чат относится к магазину, в admin_users.json которого он записан, поэтому
+    /add_user сразу меняет маршрут. Найденные маршруты кэшируются и
+    перепроверяются по кэшу пользователей магазина.
+
+    shops.json: {"shops": {"имя": {"data_dir": "data/имя", "worker": 0}}}.
+    Процесс обслуживает только магазины своего worker, так что магазины
+    раскладываются по процессам и хостам (у каждого worker свои токены ботов).
+    Без shops.json используется один магазин 'default' в папке по умолчанию.
+    """
+
+    def __init__(self, shop_dirs: Dict[str, str]):
+        self.shop_dirs = shop_dirs
+        self._routes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, default_dir: str, worker: int = 0) -> 'ShardMap':
+        """
+        Читает карту магазинов и оставляет магазины указанного worker.
+
+        Args:
+            path (str): Путь к shops.json.
+            default_dir (str): Папка данных единственного магазина, если файла нет.
+            worker (int): Номер процесса-обработчика.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                config = json.load(file)
+        except FileNotFoundError:
+            return cls({'default': default_dir})
+
+        base_dir = os.path.dirname(os.path.abspath(path))
+        shop_dirs = {}
+        for name, shop in config.get('shops', {}).items():
+            if int(shop.get('worker', 0)) != worker:
+                continue
+            shop_dirs[name] = os.path.join(base_dir, shop.get('data_dir', name))
+        if not shop_dirs:
+            raise ValueError(f'В {path} нет магазинов для worker {worker}')
+        return cls(shop_dirs)
+
+    def shops(self) -> List[str]:
+        return list(self.shop_dirs)
+
+    def store(self, shop: str) -> Store:
+        """Store магазина (один на папку данных и процесс)."""
+        return get_store(self.shop_dirs[shop])
+
+    def stores(self) -> Dict[str, Store]:
+        return {shop: self.store(shop) for shop in self.shop_dirs}
+
+    def shop_for(self, chat_id) -> Optional[str]:
+        """Магазин, к которому относится чат, или None."""
+        chat_id = str(chat_id)
+        shop = self._routes.get(chat_id)
+        if shop is not None and chat_id in self.store(shop).users:
+            return shop
+
+        with self._lock:
+            self._routes.pop(chat_id, None)
+            found = [name for name in self.shop_dirs if chat_id in self.store(name).users]
+            if not found:
+                return None
+            if len(found) > 1:
+                logger.warning('Чат %s записан в нескольких магазинах %s, используется %s', chat_id, found, found[0])
+            self._routes[chat_id] = found[0]
+            return found[0]
+
+    def store_for(self, chat_id) -> Optional[Store]:
+        """Store магазина чата или None, если чат не записан ни в одном магазине."""
+        shop = self.shop_for(chat_id)
+        return None if shop is None else self.store(shop)
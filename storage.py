@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import pickle
+import struct
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import schema
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Заголовок бинарного снимка: сигнатура, версия формата, mtime_ns и размер исходного JSON
+SNAPSHOT_MAGIC = b'VFSNAP'
+SNAPSHOT_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct('<6sBqq')
+
+
+class DataHandler:
+    """
+    Хранилище в JSON-файле с бинарным снимком рядом (file.json.snap).
+
+    Данные проходят через схему (schema.py): при чтении приводятся к единым
+    типам, при записи - к формату файла.
+
+    Снимок - pickle уже разобранных данных с заголовком версии. Он используется
+    при загрузке, только если совпадают mtime и размер JSON, из которого он
+    сделан, поэтому JSON остается основным источником данных.
+    """
+
+    def __init__(self, file_path: str, record_schema: schema.Schema = schema.PLAIN):
+        self.file_path = file_path
+        self.schema = record_schema
+        self.snapshot_path = file_path + '.snap'
+        self.name = os.path.basename(file_path)
+        # (mtime_ns, размер) файла после последней загрузки или записи этим объектом
+        self.last_stat: Optional[Tuple[int, int]] = None
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_generation = 0
+
+    def load(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            try:
+                stat = os.stat(self.file_path)
+            except FileNotFoundError:
+                self.last_stat = None
+                return {}
+            self.last_stat = (stat.st_mtime_ns, stat.st_size)
+            data = self._load_snapshot(stat)
+            if data is not None:
+                REGISTRY.inc('storage_snapshot_hits_total', file=self.name)
+                return data
+            with open(self.file_path, 'rb') as file:
+                payload = file.read()
+            data = self.schema.decode(schema.loads(payload))
+            self._write_snapshot_async(data, stat)
+            return data
+        finally:
+            REGISTRY.observe('storage_load_seconds', time.perf_counter() - start, file=self.name)
+
+    def save(self, data: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        encoded = self.schema.encode(data)
+        payload = schema.dumps(encoded)
+        # Пишем во временный файл и подменяем, чтобы читатели (и резервные
+        # копии) не видели наполовину записанный JSON
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(payload)
+        os.replace(tmp_path, self.file_path)
+        stat = os.stat(self.file_path)
+        self.last_stat = (stat.st_mtime_ns, stat.st_size)
+        REGISTRY.observe('storage_save_seconds', time.perf_counter() - start, file=self.name)
+        REGISTRY.inc('storage_bytes_written_total', len(payload), file=self.name)
+
+        self._write_snapshot_async(encoded, stat)
+
+    def is_stale(self) -> bool:
+        """Изменился ли файл на диске после последней загрузки или записи этим объектом."""
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return self.last_stat is not None
+        return (stat.st_mtime_ns, stat.st_size) != self.last_stat
+
+    def _write_snapshot_async(self, data: Dict[str, Any], stat: os.stat_result) -> None:
+        # Данные уже в форме схемы (разобраны при загрузке или только что
+        # закодированы для записи), поэтому JSON заново не разбирается. pickle
+        # снимается сразу: словари в памяти меняются после возврата из save;
+        # в фоне только пишется файл
+        body = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._snapshot_lock:
+            self._snapshot_generation += 1
+            generation = self._snapshot_generation
+        threading.Thread(target=self._write_snapshot, args=(body, stat, generation),
+                         name=f'snapshot-{self.name}', daemon=True).start()
+
+    def _load_snapshot(self, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.snapshot_path, 'rb') as file:
+                header = file.read(_SNAPSHOT_HEADER.size)
+                magic, version, mtime_ns, size = _SNAPSHOT_HEADER.unpack(header)
+                if (magic, version) != (SNAPSHOT_MAGIC, SNAPSHOT_VERSION) \
+                        or (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+                    return None
+                data = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Любой нечитаемый снимок (поврежден, другая версия кода) - читаем JSON
+            logger.warning('Снимок %s не прочитан, используется JSON: %r', self.snapshot_path, e)
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _write_snapshot(self, body: bytes, stat: os.stat_result, generation: int) -> None:
+        header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, stat.st_mtime_ns, stat.st_size)
+        with self._snapshot_lock:
+            # Более новое сохранение уже запланировало свой снимок
+            if generation != self._snapshot_generation:
+                return
+            tmp_path = self.snapshot_path + '.tmp'
+            try:
+                with open(tmp_path, 'wb') as file:
+                    file.write(header)
+                    file.write(body)
+                os.replace(tmp_path, self.snapshot_path)
+            except OSError as e:
+                logger.warning('Не удалось записать снимок %s: %s', self.snapshot_path, e)
+
+
+class MonthlyArchive:
+    """
+    Архив проданных и пропавших букетов, разбитый по месяцам.
+
+    Каждый месяц хранится в своем файле archive/<prefix>_YYYY-MM.json
+    в том же формате, что и bouquets.json: {chat_id: {bouquet_key: bouquet}}.
+    """
+
+    def __init__(self, dir_path: str, prefix: str = 'bouquets'):
+        self.dir_path = dir_path
+        self.prefix = prefix
+        self.schema = schema.BOUQUETS
+        self._handlers: Dict[str, DataHandler] = {}
+        # Месяцы, в которые писал этот процесс, держим в памяти
+        self._cache: Dict[str, Dict[str, Any]] = {}
+
+    def handler(self, month: str) -> DataHandler:
+        if month not in self._handlers:
+            path = os.path.join(self.dir_path, f'{self.prefix}_{month}.json')
+            self._handlers[month] = DataHandler(path, self.schema)
+        return self._handlers[month]
+
+    def invalidate(self) -> None:
+        """Забывает месяцы в памяти; следующая запись перечитает файл месяца."""
+        self._cache.clear()
+
+    def months(self) -> List[str]:
+        """Возвращает отсортированный список месяцев (YYYY-MM), для которых есть архив."""
+        try:
+            names = os.listdir(self.dir_path)
+        except FileNotFoundError:
+            return []
+        prefix = self.prefix + '_'
+        return sorted(name[len(prefix):-len('.json')] for name in names
+                      if name.startswith(prefix) and name.endswith('.json'))
+
+    def add(self, month: str, chat_id: str, bouquet_key: str, bouquet: Dict[str, Any]) -> None:
+        """Добавляет букет в архив месяца и сохраняет файл месяца."""
+        if month not in self._cache:
+            os.makedirs(self.dir_path, exist_ok=True)
+            self._cache[month] = self.handler(month).load()
+        data = self._cache[month]
+        data.setdefault(str(chat_id), {})[bouquet_key] = bouquet
+        self.handler(month).save(data)
+
+    def load_months(self, months: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Лениво читает архив по месяцам.
+
+        Args:
+            months (Iterable[str]): Нужные месяцы (YYYY-MM). None - все месяцы.
+
+        Returns:
+            Iterator: Пары (месяц, данные месяца).
+        """
+        available = set(self.months())
+        for month in sorted(available if months is None else available.intersection(months)):
+            yield month, self.handler(month).load()
+
+
+class EventJournal:
+    """
+    Журнал изменений склада, упорядоченный по времени.
+
+    События пишутся в файлы по дням (journal/YYYY-MM-DD.jsonl), по строке
+    JSON на событие: {"ts": ..., "kind": ..., "chat_id": ..., "key": ...}.
+    Поэтому выборка событий после момента времени читает только файлы
+    начиная с дня этого момента.
+    """
+
+    def __init__(self, dir_path: str):
+        self.dir_path = dir_path
+        self._lock = threading.Lock()
+
+    def append(self, kind: str, chat_id, key: str, **fields) -> Dict[str, Any]:
+        """
+        Добавляет событие в журнал.
+
+        Args:
+            kind (str): 'bouquet_created', 'bouquet_closed' или 'lost_flowers'.
+            chat_id: Чат, в котором лежит запись.
+            key (str): Ключ букета или момент учета пропавших цветов.
+
+        Returns:
+            dict: Записанное событие.
+        """
+        with self._lock:
+            event = {'ts': datetime.now().isoformat(), 'kind': kind, 'chat_id': str(chat_id), 'key': key, **fields}
+            os.makedirs(self.dir_path, exist_ok=True)
+            path = os.path.join(self.dir_path, f"{event['ts'][:10]}.jsonl")
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        return event
+
+    def since(self, ts: str) -> Iterator[Dict[str, Any]]:
+        """Возвращает события строго после момента ts (isoformat) в порядке записи."""
+        try:
+            names = sorted(name for name in os.listdir(self.dir_path) if name.endswith('.jsonl'))
+        except FileNotFoundError:
+            return
+        first_day = ts[:10]
+        for name in names:
+            if name[:-len('.jsonl')] < first_day:
+                continue
+            with open(os.path.join(self.dir_path, name), 'r', encoding='utf-8') as file:
+                for line in file:
+                    event = json.loads(line)
+                    if event['ts'] > ts:
+                        yield event
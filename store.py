@@ -0,0 +1,190 @@
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any
+
+import schema
+from indexes import StockIndex
+from storage import DataHandler, EventJournal, MonthlyArchive
+from users import UserDirectory
+
+# Отметка о восстановлении из копии: по ней другие процессы магазина
+# отличают восстановление от обычной записи файлов
+RESTORE_MARKER_FILE = 'restore.json'
+
+
+class Store:
+    """
+    Данные магазина в памяти: склад, пропавшие цветы, архив, журнал,
+    пользователи и индексы поверх них.
+
+    Один объект на папку данных и процесс (см. get_store), поэтому бот
+    продавцов и админ-бот в одном процессе работают с общими данными.
+    Изменения словарей делаются под lock.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.lock = threading.RLock()
+        # Растет после каждого восстановления из копии (см. reload)
+        self.restore_epoch = 0
+
+        self.bouquets_handler = DataHandler(os.path.join(data_dir, 'bouquets.json'), schema.BOUQUETS)
+        self.lost_flowers_handler = DataHandler(os.path.join(data_dir, 'lost_flowers.json'), schema.LOST_FLOWERS)
+        self.admin_users_handler = DataHandler(os.path.join(data_dir, 'admin_users.json'), schema.ADMIN_USERS)
+        self.archive = MonthlyArchive(os.path.join(data_dir, 'archive'))
+        self.journal = EventJournal(os.path.join(data_dir, 'journal'))
+        self.users = UserDirectory(self.admin_users_handler)
+        self.restore_handler = DataHandler(os.path.join(data_dir, RESTORE_MARKER_FILE))
+        self.restore_handler.load()
+
+        self.bouquets: Dict[str, Dict[str, Any]] = self.bouquets_handler.load()
+        self.lost_flowers: Dict[str, Dict[str, Any]] = self.lost_flowers_handler.load()
+        self.stock_index = StockIndex.build(self.bouquets)
+
+    def refresh(self) -> bool:
+        """
+        Перечитывает склад и пропавшие цветы, если файлы изменил другой процесс.
+
+        Словари обновляются на месте, поэтому ссылки на них остаются верными.
+        Обычная запись другого процесса перечитывает только изменившийся файл;
+        восстановление из копии (новая отметка RESTORE_MARKER_FILE) - все
+        данные, как reload.
+
+        Returns:
+            bool: True, если что-то перечитано.
+        """
+        with self.lock:
+            if self.restore_handler.is_stale():
+                self.restore_handler.load()
+                self.reload()
+                return True
+            reloaded = False
+            if self.bouquets_handler.is_stale():
+                self._reload_bouquets()
+                reloaded = True
+            if self.lost_flowers_handler.is_stale():
+                self._reload_lost_flowers()
+                reloaded = True
+            return reloaded
+
+    def reload(self) -> None:
+        """Перечитывает все данные магазина с диска (после восстановления из копии)."""
+        with self.lock:
+            self._reload_bouquets()
+            self._reload_lost_flowers()
+            self.archive.invalidate()
+            self.users.invalidate()
+            self.restore_epoch += 1
+
+    def mark_restored(self, source: str) -> None:
+        """Записывает отметку о восстановлении из копии source и перечитывает данные."""
+        with self.lock:
+            self.restore_handler.save({'restored_at': datetime.now().isoformat(),
+                                       'source': os.path.basename(source)})
+            self.reload()
+
+    def _reload_bouquets(self) -> None:
+        fresh = self.bouquets_handler.load()
+        self.bouquets.clear()
+        self.bouquets.update(fresh)
+        self.stock_index.clear()
+        for chat_id_key, bouquets_info in self.bouquets.items():
+            for bouquet_key, bouquet_data in bouquets_info.items():
+                self.stock_index.add(chat_id_key, bouquet_key, bouquet_data)
+
+    def _reload_lost_flowers(self) -> None:
+        fresh = self.lost_flowers_handler.load()
+        self.lost_flowers.clear()
+        self.lost_flowers.update(fresh)
+
+    def save_bouquets(self) -> bool:
+        """
+        Записывает склад на диск.
+
+        Если файл склада изменил другой процесс, его версия главнее: данные
+        перечитываются, а изменения в памяти не записываются.
+
+        Returns:
+            bool: True, если склад записан.
+        """
+        with self.lock:
+            if self.bouquets_handler.is_stale():
+                self.refresh()
+                return False
+            self.bouquets_handler.save(self.bouquets)
+            return True
+
+    def save_lost_flowers(self) -> bool:
+        """Записывает пропавшие цветы на диск (как save_bouquets)."""
+        with self.lock:
+            if self.lost_flowers_handler.is_stale():
+                self.refresh()
+                return False
+            self.lost_flowers_handler.save(self.lost_flowers)
+            return True
+
+    def archive_bouquet(self, chat_id_key: str, bouquet_key: str, **changes) -> bool:
+        """
+        Переносит проданный или пропавший букет из склада в архив его месяца.
+
+        Args:
+            changes: Поля, которые записываются в букет перед переносом.
+
+        Returns:
+            bool: False, если букета нет на складе (например, склад только что
+            перечитан после восстановления из копии).
+        """
+        with self.lock:
+            self.refresh()
+            bouquet_data = self.bouquets.get(chat_id_key, {}).pop(bouquet_key, None)
+            if bouquet_data is None:
+                return False
+            bouquet_data.update(changes)
+            self.stock_index.remove(bouquet_key)
+            month = bouquet_data['sold_lost_date'][:7]
+            self.archive.add(month, chat_id_key, bouquet_key, bouquet_data)
+            self.journal.append('bouquet_closed', chat_id_key, bouquet_key, month=month,
+                                is_lost=int(bool(bouquet_data.get('is_lost'))))
+            return True
+
+    def archive_closed_bouquets(self) -> int:
+        """
+        Переносит в архив букеты, проданные или потерянные до появления архива.
+
+        Returns:
+            int: Сколько букетов перенесено.
+        """
+        with self.lock:
+            self.refresh()
+            closed = [(chat_id_key, bouquet_key)
+                      for chat_id_key, bouquets_info in self.bouquets.items()
+                      for bouquet_key, bouquet_data in bouquets_info.items()
+                      if bouquet_data.get('sold_flag') or bouquet_data.get('is_lost')]
+            for chat_id_key, bouquet_key in closed:
+                self.archive_bouquet(chat_id_key, bouquet_key)
+            if closed:
+                self.save_bouquets()
+            return len(closed)
+
+    def bouquets_copy(self) -> Dict[str, Dict[str, Any]]:
+        """Копия склада (два уровня словарей) для чтения без блокировки."""
+        with self.lock:
+            return {chat_id_key: dict(bouquets_info) for chat_id_key, bouquets_info in self.bouquets.items()}
+
+    def lost_flowers_copy(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {chat_id_key: dict(timestamps_info) for chat_id_key, timestamps_info in self.lost_flowers.items()}
+
+
+_stores: Dict[str, Store] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(data_dir: str) -> Store:
+    """Возвращает общий для процесса Store папки данных (создается при первом вызове)."""
+    key = os.path.abspath(data_dir)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = Store(key)
+        return _stores[key]
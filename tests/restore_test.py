@@ -0,0 +1,141 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+# Токен нужен только для создания TeleBot при импорте, в сеть тесты не ходят
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123:test')
+
+import analytics
+import backups
+import main_telebot
+from indexes import BoundedLRU
+from store import Store, get_store
+
+SELLER_ID = 2
+BOUQUET_KEY = '2024-05-01T10:00:00'
+
+
+class FakeBot:
+    """Записывает ответы бота вместо отправки в Telegram."""
+
+    def __init__(self):
+        self.sent = []
+
+    def answer_callback_query(self, call_id, text=None, **kwargs):
+        self.sent.append(text)
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+
+class FakeShards:
+    def __init__(self, store):
+        self.store = store
+
+    def store_for(self, chat_id):
+        return self.store
+
+
+class RestoreTest(unittest.TestCase):
+    """Резервная копия -> продажа -> восстановление -> повторная продажа того же букета."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        users = {'admins': [], 'users': [{'chat_id': str(SELLER_ID), 'name': 'Продавец'}]}
+        bouquet = {'price': 1500.0, 'composition': {'роза': 5}, 'sold_flag': 0, 'is_lost': 0,
+                   'seller_id': '', 'sold_lost_date': ''}
+        self.write_json('admin_users.json', users)
+        self.write_json('bouquets.json', {str(SELLER_ID): {BOUQUET_KEY: bouquet}})
+
+        self.bot = FakeBot()
+        self.patch(main_telebot, 'bot', self.bot)
+        self.patch(main_telebot, 'seen_callbacks', BoundedLRU(64))
+        self.patch(main_telebot, 'claimed_bouquets', BoundedLRU(64))
+
+    def write_json(self, name, data):
+        with open(os.path.join(self.data_dir, name), 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+
+    def patch(self, obj, name, value):
+        self.addCleanup(setattr, obj, name, getattr(obj, name))
+        setattr(obj, name, value)
+
+    def use_seller_store(self, store):
+        self.patch(main_telebot, 'shards', FakeShards(store))
+
+    def sell(self, call_id):
+        call = SimpleNamespace(id=call_id, data=json.dumps([SELLER_ID, BOUQUET_KEY, 'sold_flag']),
+                               message=SimpleNamespace(chat=SimpleNamespace(id=SELLER_ID)))
+        main_telebot.select_bouquet_by_number(call)
+
+    def check_sell_again_after_restore(self, seller_store, admin_store):
+        self.use_seller_store(seller_store)
+
+        backups.take_snapshot(admin_store)
+        self.sell('first')
+        self.assertEqual(self.bot.sent[-1], 'Букет учтен')
+        self.assertNotIn(BOUQUET_KEY, seller_store.bouquets[str(SELLER_ID)])
+
+        backups.restore_snapshot(admin_store, datetime.now())
+        self.assertIn(BOUQUET_KEY, admin_store.bouquets[str(SELLER_ID)])
+
+        self.sell('second')
+        self.assertEqual(self.bot.sent[-1], 'Букет учтен')
+
+        # Вторая продажа легла поверх восстановленных данных, а не старого склада
+        on_disk = Store(self.data_dir)
+        self.assertNotIn(BOUQUET_KEY, on_disk.bouquets[str(SELLER_ID)])
+        archived = {key for _, month in on_disk.archive.load_months() for key in month.get(str(SELLER_ID), {})}
+        self.assertEqual(archived, {BOUQUET_KEY})
+
+    def test_single_process(self):
+        # run_bots.py: оба бота работают с одним Store
+        store = get_store(self.data_dir)
+        self.check_sell_again_after_restore(store, store)
+
+    def test_two_processes(self):
+        # Отдельные процессы продавцов и админов: у каждого свой Store на той же папке
+        self.check_sell_again_after_restore(Store(self.data_dir), Store(self.data_dir))
+
+    def test_stale_seller_does_not_overwrite_restore(self):
+        seller_store, admin_store = Store(self.data_dir), Store(self.data_dir)
+        self.use_seller_store(seller_store)
+
+        backups.take_snapshot(admin_store)
+        self.sell('first')
+        backups.restore_snapshot(admin_store, datetime.now())
+
+        # Склад продавца устарел: запись не должна затереть восстановленный файл
+        self.assertFalse(seller_store.save_bouquets())
+        self.assertIn(BOUQUET_KEY, Store(self.data_dir).bouquets[str(SELLER_ID)])
+        self.assertIn(BOUQUET_KEY, seller_store.bouquets[str(SELLER_ID)])
+
+    def test_seller_write_is_not_a_restore(self):
+        seller_store, admin_store = Store(self.data_dir), Store(self.data_dir)
+        self.use_seller_store(seller_store)
+        series = analytics.LossSeries(admin_store)
+        builds = []
+        build = series._build
+        series._build = lambda: builds.append(1) or build()
+
+        series.columns()
+        self.sell('first')
+        series.columns()
+        # Обычная запись продавца: ряд дополняется по журналу, без перестройки
+        self.assertEqual((len(builds), admin_store.restore_epoch), (1, 0))
+
+        backups.take_snapshot(admin_store)
+        backups.restore_snapshot(Store(self.data_dir), datetime.now())
+        series.columns()
+        self.assertEqual((len(builds), admin_store.restore_epoch), (2, 1))
+        self.assertTrue(seller_store.refresh())
+        self.assertEqual(seller_store.restore_epoch, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
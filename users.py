@@ -0,0 +1,82 @@
+import threading
+from typing import Dict, Any, List, Optional
+
+from storage import DataHandler
+
+ROLES = ('admins', 'users')
+
+
+class UserDirectory:
+    """
+    Кэш admin_users.json: словарь chat_id -> запись и индекс по ролям.
+
+    Файл перечитывается, только если изменился на диске (например, его
+    изменил другой процесс); запись через add() и delete() сохраняет файл
+    и сбрасывает кэш.
+    """
+
+    def __init__(self, handler: DataHandler):
+        self.handler = handler
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_role: Dict[str, List[Dict[str, Any]]] = {}
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self._data is not None and not self.handler.is_stale():
+                return
+            data = self.handler.load()
+            by_id, by_role = {}, {}
+            for role in ROLES:
+                by_role[role] = data.get(role, [])
+                for user in by_role[role]:
+                    by_id[str(user['chat_id'])] = {**user, 'role': role}
+            self._data, self._by_id, self._by_role = data, by_id, by_role
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data = None
+
+    def __contains__(self, chat_id) -> bool:
+        self._ensure_loaded()
+        return str(chat_id) in self._by_id
+
+    def get(self, chat_id) -> Optional[Dict[str, Any]]:
+        """Запись пользователя с полем role или None."""
+        self._ensure_loaded()
+        return self._by_id.get(str(chat_id))
+
+    def role(self, role: str) -> List[Dict[str, Any]]:
+        """Пользователи с указанной ролью ('admins' или 'users')."""
+        self._ensure_loaded()
+        return list(self._by_role.get(role, []))
+
+    def names(self) -> Dict[str, str]:
+        """Имена пользователей по chat_id (для отчетов)."""
+        self._ensure_loaded()
+        return {chat_id: user['name'] for chat_id, user in self._by_id.items()}
+
+    def add(self, role: str, chat_id, name: str) -> None:
+        """Добавляет пользователя с ролью и сохраняет файл."""
+        with self._lock:
+            data = self.handler.load()
+            data.setdefault(role, []).append({'chat_id': str(chat_id), 'name': name})
+            self.handler.save(data)
+            self.invalidate()
+
+    def delete(self, chat_id, role: str = 'users') -> bool:
+        """
+        Удаляет пользователя с ролью и сохраняет файл.
+
+        Returns:
+            bool: True, если пользователь был найден.
+        """
+        with self._lock:
+            data = self.handler.load()
+            remaining = [user for user in data.get(role, []) if str(user['chat_id']) != str(chat_id)]
+            found = len(remaining) != len(data.get(role, []))
+            data[role] = remaining
+            self.handler.save(data)
+            self.invalidate()
+            return found